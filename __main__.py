@@ -2,13 +2,13 @@
 # __main__.py (governança adaptativa + progresso total e por lote)
 
 - Presets conservadores vindos do config (features por modo: leve/completo).
-- Spinner simples de atividade.
+- Indicador de atividade girando na própria barra TOTAL (sem thread extra).
 - Duas barras de progresso: TOTAL (contínua) e LOTE (reinicia por lote).
-- Governança adaptativa bidirecional, menos agressiva:
-  * Reduz batch/hosts/portas apenas quando lento de verdade
-    ou quando há timeouts (com histerese/cooldown).
-  * Aumenta devagar após lotes bons consecutivos.
-- Atualização NVD opcional.
+- Governança adaptativa AIMD (ver governance.py):
+  * Corte multiplicativo de batch/hosts/portas quando lento de verdade
+    ou quando há timeouts (cooldown de 1 lote).
+  * Aumento aditivo (alpha/valor) a cada lote bom.
+- Atualização NVD opcional (controle de data em nvd_state.py).
 - Verificação de CVEs opcional (só se houver banners).
 
 Autor: Luiz
@@ -17,248 +17,50 @@ Autor: Luiz
 from __future__ import annotations
 
 import os
-import sys
 import time
-import threading
 import itertools
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Tuple
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional
 
 from tqdm import tqdm
 from rich.console import Console
 
 from config import auto_configurar
 from utils import solicitar_dados_input, carregar_tabela_oui
-from relatorio import gerar_tabela, exportar_csv
+from relatorio import gerar_tabela, exportar_csv, linha_jsonl
 from atualizar_nvd import atualizar_base_nvd
-
-# Caminhos NVD
-CAMINHO_NVD = "nvd_data"
-CAMINHO_REGISTRO_ATUALIZACAO = os.path.join(CAMINHO_NVD, "ultima_atualizacao.txt")
-INTERVALO_DIAS_ATUALIZACAO = 7  # dias
+from governance import AdaptiveGovernor
+from nvd_state import precisa_atualizar_nvd, registrar_data_atualizacao
 
 console = Console()
 
 
 # ==============================
-# Utilidades NVD
-# ==============================
-
-def precisa_atualizar_nvd() -> bool:
-    """True se passou o intervalo definido ou se o arquivo de verificação não existe."""
-    try:
-        if not os.path.exists(CAMINHO_REGISTRO_ATUALIZACAO):
-            return True
-        with open(CAMINHO_REGISTRO_ATUALIZACAO, "r", encoding="utf-8") as f:
-            ultima_str = f.read().strip()
-            ultima_data = datetime.strptime(ultima_str, "%Y-%m-%d")
-        return datetime.now() - ultima_data > timedelta(days=INTERVALO_DIAS_ATUALIZACAO)
-    except Exception:
-        return True
-
-
-def registrar_data_atualizacao() -> None:
-    """Registra a data da última atualização da base NVD em arquivo."""
-    os.makedirs(CAMINHO_NVD, exist_ok=True)
-    with open(CAMINHO_REGISTRO_ATUALIZACAO, "w", encoding="utf-8") as f:
-        f.write(datetime.now().strftime("%Y-%m-%d"))
-
-
-# ==============================
-# Spinner
+# NVD em segundo plano
 # ==============================
 
-def start_spinner(msg: str = "Processando..."):
-    """Spinner leve em thread separada; retorna Event para parar."""
-    stop_flag = threading.Event()
-    spinner_cycle = itertools.cycle(["|", "/", "-", "\\"])
+def _cronometrado(marca: list, fn, *args, **kwargs):
+    """Roda `fn` na thread do pool anotando em `marca[0]` quando ela COMEÇOU (não quando entrou na fila)."""
+    marca[0] = time.time()
+    return fn(*args, **kwargs)
 
-    def run_spinner():
-        while not stop_flag.is_set():
-            sys.stdout.write(f"\r{msg} {next(spinner_cycle)}")
-            sys.stdout.flush()
-            time.sleep(0.1)
-        # limpar linha ao parar
-        sys.stdout.write("\r" + " " * (len(msg) + 4) + "\r")
-        sys.stdout.flush()
 
-    t = threading.Thread(target=run_spinner, daemon=True)
-    t.start()
-    return stop_flag
-
-
-# ==============================
-# Governança adaptativa (menos agressiva)
-# ==============================
-
-class AdaptiveGovernor:
+def _atualizar_nvd_seguro(mensagens: List[str]) -> Optional[str]:
     """
-    Governança com histerese/cooldown e critérios mais conservadores.
-    - Reduz quando: lote MUITO lento OU (lento + timeouts).
-    - Prioriza reduzir batch; só mexe em hosts/portas após N lotes lentos seguidos.
-    - Sobe devagar após N lotes bons.
-    - Timeout aumenta apenas se houver timeouts reais.
+    Atualiza a base NVD; devolve a mensagem de erro (ou None) em vez de propagar.
+    O progresso do download vai para `mensagens` (não para a tela: roda
+    durante o scan, e prints soltos quebrariam as barras do tqdm).
     """
-
-    def __init__(
-        self,
-        batch_ini: int,
-        hosts_ini: int,
-        portas_ini: int,
-        timeout_ini: float,
-        # limites
-        batch_min: int = 6,
-        batch_max: int = 16,
-        hosts_min: int = 4,
-        hosts_max: int = 12,
-        portas_min: int = 2,
-        portas_max: int = 6,
-        timeout_min: float = 1.5,
-        timeout_max: float = 5.0,
-        # critérios
-        lote_lento_seg: float = 40.0,        # redes lentas não disparam corte cedo
-        lote_muito_lento_seg: float = 60.0,  # muito lento => pode cortar batch mesmo sem timeout
-        timeout_ratio_corta: float = 0.30,   # >30% timeouts = sufoco
-        timeout_ratio_moderado: float = 0.10,# >10% já preocupa
-        folga_seg: float = 12.0,             # lote rápido
-        timeout_ratio_baixo: float = 0.05,   # <5% timeouts = ok
-        # histerese/cooldown
-        cool_down_lotes: int = 2,
-        lotes_bons_para_subir: int = 3,
-        # proteção contra “sanfona”
-        max_cortes_por_lote: int = 1,
-        consecutive_slow_to_cut_hosts: int = 2,
-        consecutive_slow_to_cut_ports: int = 3,
-    ):
-        self.batch = batch_ini
-        self.hosts = hosts_ini
-        self.portas = portas_ini
-        self.timeout = timeout_ini
-
-        self.batch_min = batch_min
-        self.batch_max = batch_max
-        self.hosts_min = hosts_min
-        self.hosts_max = hosts_max
-        self.portas_min = portas_min
-        self.portas_max = portas_max
-        self.timeout_min = timeout_min
-        self.timeout_max = timeout_max
-
-        self.lote_lento_seg = lote_lento_seg
-        self.lote_muito_lento_seg = lote_muito_lento_seg
-        self.timeout_ratio_corta = timeout_ratio_corta
-        self.timeout_ratio_moderado = timeout_ratio_moderado
-        self.folga_seg = folga_seg
-        self.timeout_ratio_baixo = timeout_ratio_baixo
-
-        self.cool_down_lotes = cool_down_lotes
-        self.lotes_bons_para_subir = lotes_bons_para_subir
-        self.max_cortes_por_lote = max_cortes_por_lote
-        self.consecutive_slow_to_cut_hosts = consecutive_slow_to_cut_hosts
-        self.consecutive_slow_to_cut_ports = consecutive_slow_to_cut_ports
-
-        self._cooldown = 0
-        self._bons_consecutivos = 0
-        self._lentos_consecutivos = 0
-
-    def _clamp(self):
-        self.batch = max(self.batch_min, min(self.batch_max, int(self.batch)))
-        self.hosts = max(self.hosts_min, min(self.hosts_max, int(self.hosts)))
-        self.portas = max(self.portas_min, min(self.portas_max, int(self.portas)))
-        self.timeout = max(self.timeout_min, min(self.timeout_max, float(self.timeout)))
-
-    def suggest(self, duracao_lote: float, timeouts: int, concluidos: int) -> Tuple[bool, str]:
-        """Decide se ajusta e como. Retorna (ajustou, mensagem)."""
-        if concluidos <= 0:
-            return False, ""
-
-        ratio_timeout = timeouts / max(1, concluidos)
-        lote_lento = duracao_lote > self.lote_lento_seg
-        lote_muito_lento = duracao_lote > self.lote_muito_lento_seg
-
-        if lote_lento:
-            self._lentos_consecutivos += 1
-        else:
-            self._lentos_consecutivos = 0
-
-        # cooldown em andamento: apenas contabiliza "bons" e sai
-        if self._cooldown > 0:
-            self._cooldown -= 1
-            if (duracao_lote <= self.folga_seg) and (ratio_timeout <= self.timeout_ratio_baixo):
-                self._bons_consecutivos += 1
-            else:
-                self._bons_consecutivos = 0
-            return False, ""
-
-        # ======= REDUÇÃO =======
-
-        # (A) Muito lento => reduz batch (15%) mesmo sem timeouts
-        if lote_muito_lento and self.max_cortes_por_lote > 0:
-            if self.batch > self.batch_min:
-                self.batch = max(self.batch_min, int(self.batch * 0.85))
-                self._clamp()
-                self._cooldown = self.cool_down_lotes
-                return True, f"reduzindo batch->{self.batch} (muito lento: {duracao_lote:.1f}s)"
-
-        # (B) Lento + timeouts moderados => reduz batch (15%)
-        if lote_lento and ratio_timeout >= self.timeout_ratio_moderado and self.max_cortes_por_lote > 0:
-            if self.batch > self.batch_min:
-                self.batch = max(self.batch_min, int(self.batch * 0.85))
-                self._clamp()
-                self._cooldown = self.cool_down_lotes
-                return True, f"reduzindo batch->{self.batch} (lento e timeouts {ratio_timeout:.0%})"
-
-        # (C) Após 2 lotes lentos seguidos => reduz hosts (15%)
-        if lote_lento and self._lentos_consecutivos >= self.consecutive_slow_to_cut_hosts and self.max_cortes_por_lote > 0:
-            if self.hosts > self.hosts_min:
-                self.hosts = max(self.hosts_min, int(self.hosts * 0.85))
-                self._clamp()
-                self._cooldown = self.cool_down_lotes
-                return True, f"reduzindo hosts->{self.hosts} (lentos {self._lentos_consecutivos}x)"
-
-        # (D) Após 3 lotes lentos seguidos => reduz portas (-1)
-        if lote_lento and self._lentos_consecutivos >= self.consecutive_slow_to_cut_ports and self.max_cortes_por_lote > 0:
-            if self.portas > self.portas_min:
-                self.portas = max(self.portas_min, self.portas - 1)
-                self._clamp()
-                self._cooldown = self.cool_down_lotes
-                return True, f"reduzindo portas->{self.portas} (lentos {self._lentos_consecutivos}x)"
-
-        # (E) Aumenta timeout só se houver timeouts reais
-        if ratio_timeout >= self.timeout_ratio_moderado and self.timeout < self.timeout_max:
-            self.timeout = min(self.timeout_max, self.timeout + 0.5)
-            self._clamp()
-            self._cooldown = self.cool_down_lotes
-            return True, f"aumentando timeout->{self.timeout:.1f}s (timeouts {ratio_timeout:.0%})"
-
-        # ======= AUMENTO (devagar) =======
-        if (duracao_lote <= self.folga_seg) and (ratio_timeout <= self.timeout_ratio_baixo):
-            self._bons_consecutivos += 1
-        else:
-            self._bons_consecutivos = 0
-
-        if self._bons_consecutivos >= self.lotes_bons_para_subir:
-            if self.batch < self.batch_max:
-                self.batch = min(self.batch_max, self.batch + 1)
-                self._bons_consecutivos = 0
-                self._cooldown = self.cool_down_lotes
-                self._clamp()
-                return True, f"aumentando batch->{self.batch} (estável {self.lotes_bons_para_subir} lotes)"
-            elif self.hosts < self.hosts_max:
-                self.hosts = min(self.hosts_max, self.hosts + 1)
-                self._bons_consecutivos = 0
-                self._cooldown = self.cool_down_lotes
-                self._clamp()
-                return True, f"aumentando hosts->{self.hosts} (estável {self.lotes_bons_para_subir} lotes)"
-            elif self.portas < self.portas_max:
-                self.portas = min(self.portas_max, self.portas + 1)
-                self._bons_consecutivos = 0
-                self._cooldown = self.cool_down_lotes
-                self._clamp()
-                return True, f"aumentando portas->{self.portas} (estável {self.lotes_bons_para_subir} lotes)"
-
-        return False, ""
+    try:
+        atualizar_base_nvd(log=mensagens.append)
+        registrar_data_atualizacao()
+        # feeds novos: índice CPE (e memos de buckets/casamentos) recarregam no próximo uso
+        from cve import construir_indice_cpe
+        construir_indice_cpe.cache_clear()
+        return None
+    except Exception as e:
+        return str(e)
 
 
 # ==============================
@@ -276,11 +78,12 @@ def main():
 
     # 2) Ajustar ENV antes de importar scan (compat com scan.py que lê ENV)
     os.environ["VH_MAX_SOCKETS"] = str(int(config["max_sockets"]))
-    os.environ["VH_RESOLVE_HOSTNAME"] = "1" if config["resolve_hostname"] else "0"
     os.environ["VH_TCP_ONLY"] = "1" if config["tcp_only"] else "0"
 
     # 3) Import tardio do scan
-    from scan import verificar_host  # noqa: E402
+    from scan import (  # noqa: E402
+        verificar_host, resolver_hostnames, resolver_macs, HostResult, PORTAS_COMUNS,
+    )
 
     # 4) Log de config efetiva
     console.print(
@@ -298,16 +101,14 @@ def main():
         f"adaptive={int(ADAPTIVE)}"
     )
 
-    # 5) NVD opcional
+    # 5) NVD opcional: baixa em segundo plano durante o scan (junta antes dos CVEs)
+    nvd_future = None
+    nvd_mensagens: List[str] = []
     if not SKIP_NVD_UPDATE and precisa_atualizar_nvd():
-        console.print("\n[bold yellow]Atualizando base de vulnerabilidades da NVD...[/bold yellow]")
-        console.print("[cyan]Verificando atualizações da base CVE...[/cyan]")
-        try:
-            atualizar_base_nvd()
-            registrar_data_atualizacao()
-            console.print("[green]Base NVD atualizada com sucesso.[/green]\n")
-        except Exception as e:
-            console.print(f"[red]Falha ao atualizar base NVD: {e}[/red]")
+        console.print("\n[bold yellow]Atualizando base de vulnerabilidades da NVD em segundo plano...[/bold yellow]")
+        nvd_pool = ThreadPoolExecutor(max_workers=1)
+        nvd_future = nvd_pool.submit(_atualizar_nvd_seguro, nvd_mensagens)
+        nvd_pool.shutdown(wait=False)
     else:
         console.print("\n[bold cyan]Pulando atualização da NVD (recente ou config.skip_nvd_update=0).[/bold cyan]\n")
 
@@ -324,24 +125,31 @@ def main():
         console.print("\n[yellow]Cancelado pelo usuário.[/yellow]")
         return
 
-    if fim < inicio:
-        console.print("[red]Intervalo inválido: fim < início.[/red]")
-        return
+    # Base e faixa já validadas em solicitar_dados_input (octetos e 1 <= início <= fim <= 254).
+    # IPs gerados por aritmética sobre a base inteira, sem f-string/parse por IP
+    base_int = int(ipaddress.IPv4Address(f"{ip_base}.0"))
+    lista_ips = [str(ipaddress.IPv4Address(base_int + i)) for i in range(inicio, fim + 1)]
 
-    lista_ips = [f"{ip_base}.{i}" for i in range(inicio, fim + 1)]
-    if not lista_ips:
-        console.print("[red]Nenhum IP no intervalo informado.[/red]")
-        return
+    # 7) CVEs no próprio pipeline: cada host consulta o índice logo após os
+    #    banners (CPU sobreposta à espera de rede). Só dá para fazer isso se a
+    #    base não estiver sendo atualizada em paralelo; senão fica p/ o passo 10.
+    cve_inline = not SKIP_CVE and nvd_future is None
+    if cve_inline:
+        try:
+            from cve import carregar_base_local_cves
+            carregar_base_local_cves()  # índice pronto antes das threads (somente leitura)
+        except Exception as e:
+            console.print(f"[red]Falha ao carregar base de CVEs: {e}[/red]")
+            cve_inline = False
 
-    # 7) Scanner com governança + DUAS barras (total e lote)
-    status_dict: Dict[str, dict] = {}
-    spinner_flag = start_spinner("Verificando hosts e portas")
+    # 8) Scanner com governança + DUAS barras (total e lote)
+    status_dict: Dict[str, "HostResult"] = {}
 
     hosts_workers = int(config["max_workers_hosts"])
     portas_workers = int(config["max_workers_portas"])
     timeout_socket = float(config["timeout_socket"])
 
-    # Governor com thresholds mais relaxados (rede lenta não vira “pânico”)
+    # Governor AIMD guiado por goodput (sem limiares fixos em segundos)
     gov = AdaptiveGovernor(
         batch_ini=BATCH_SIZE,
         hosts_ini=hosts_workers,
@@ -351,109 +159,249 @@ def main():
         hosts_min=4, hosts_max=12,
         portas_min=2, portas_max=6,
         timeout_min=1.5, timeout_max=5.0,
-        lote_lento_seg=max(40.0, timeout_socket * 8),
-        lote_muito_lento_seg=max(60.0, timeout_socket * 12),
-        timeout_ratio_corta=0.30,
+        fator_goodput_lento=0.7,
+        janela_goodput=8,
         timeout_ratio_moderado=0.10,
-        folga_seg=max(12.0, timeout_socket * 3),
-        timeout_ratio_baixo=0.05,
-        cool_down_lotes=2,
-        lotes_bons_para_subir=3,
-        max_cortes_por_lote=1,
-        consecutive_slow_to_cut_hosts=2,
-        consecutive_slow_to_cut_ports=3,
+        beta=0.7,
+        alpha_batch=1.0, alpha_hosts=0.5, alpha_portas=0.25,
+        cool_down_lotes=1,
     )
 
     total_ips = len(lista_ips)
-    pbar_total = tqdm(total=total_ips, desc="Total", ncols=100, position=0, dynamic_ncols=True)
-
-    try:
-        pos = 0
-        lote_idx = 0
-        total = total_ips
+    # Atividade: o glifo gira a cada update (uma escrita por update, sem thread)
+    # (descrições pré-montadas: nenhuma formatação de string por update)
+    spinner_cycle = itertools.cycle([f"Total {g}" for g in ("|", "/", "-", "\\")])
+    pbar_total = tqdm(
+        total=total_ips, desc="Total", ncols=100, position=0, dynamic_ncols=True,
+        mininterval=0.2,
+        bar_format="{desc} {bar} {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
+    )
 
-        while pos < total:
-            lote_idx += 1
-            fim_i = min(total, pos + BATCH_SIZE)
-            batch_ips = lista_ips[pos:fim_i]
-            pos = fim_i
+    # Pool único, dimensionado pelo teto do governor: as threads vivem o scan
+    # inteiro. Janela deslizante: sempre `hosts_workers` hosts em voo; assim
+    # que um termina, o próximo IP entra (sem barreira entre lotes).
+    pool = ThreadPoolExecutor(max_workers=gov.hosts_max)
+    em_voo: Dict[Future, str] = {}
+    # [início] preenchido pela própria thread ao começar (None = ainda na fila)
+    inicio_host: Dict[Future, list] = {}
+    # Vencidos cuja thread ainda roda: seguem ocupando a janela até terminar,
+    # senão a fila do pool enche de hosts que vencem sem nunca ter rodado
+    abandonados: set = set()
+    proximos_ips = iter(lista_ips)
+    ips_esgotados = False
+
+    # Barra de LOTE alocada uma vez; cada lote só faz reset()
+    pbar_lote = tqdm(
+        total=BATCH_SIZE, ncols=100, position=1, leave=False, dynamic_ncols=True, mininterval=0.2
+    )
 
-            t0 = time.time()
-            timeouts = 0
-            concluidos = 0
+    # Updates das barras acumulados: no máx. 1 par de chamadas a cada
+    # hosts_workers/2 conclusões ou 100 ms (e sempre no fechamento do lote)
+    pendentes_pbar = 0
+    ultimo_update_pbar = time.monotonic()
+
+    def descarregar_pbars() -> None:
+        nonlocal pendentes_pbar, ultimo_update_pbar
+        if pendentes_pbar:
+            pbar_lote.update(pendentes_pbar)
+            pbar_total.set_description_str(next(spinner_cycle), refresh=False)
+            pbar_total.update(pendentes_pbar)
+            pendentes_pbar = 0
+        ultimo_update_pbar = time.monotonic()
+
+    def iniciar_pbar_lote(idx: int, restantes: int) -> None:
+        pbar_lote.reset(total=min(BATCH_SIZE, restantes))
+        pbar_lote.set_description(
+            f"Lote {idx} (hosts={hosts_workers},portas={portas_workers},batch={BATCH_SIZE})"
+        )
+
+    # Resultados gravados host a host (JSONL, buffer de linha). Truncado por
+    # execução: append misturaria linhas de scans diferentes sem como separar
+    saida_jsonl = None
+    if config["results_jsonl"]:
+        try:
+            saida_jsonl = open(config["results_jsonl"], "w", buffering=1, encoding="utf-8")
+        except OSError as e:
+            console.print(f"[red]Não foi possível abrir {config['results_jsonl']}: {e}[/red]")
+
+    # ONLINE aguardando MAC: a tabela ARP é lida a cada fechamento de lote,
+    # não só no fim — entradas de vizinhos expiram em ~30-60 s (Linux) e os
+    # primeiros hosts de uma varredura longa já teriam saído dela
+    pendentes_mac: List[str] = []
+
+    def registrar_resultado(resultado: "HostResult") -> None:
+        status_dict[resultado.ip] = resultado
+        if resultado.status == "ONLINE":
+            pendentes_mac.append(resultado.ip)
+        if saida_jsonl is not None:
+            saida_jsonl.write(linha_jsonl(resultado))
+
+    def descarregar_macs() -> None:
+        if not pendentes_mac:
+            return
+        for ip, (mac, fabricante) in resolver_macs(pendentes_mac, fabricantes).items():
+            status_dict[ip].mac = mac
+            status_dict[ip].fabricante = fabricante
+        pendentes_mac.clear()
 
-            pbar_lote = tqdm(
-                total=len(batch_ips),
-                desc=f"Lote {lote_idx} (hosts={hosts_workers},portas={portas_workers},batch={BATCH_SIZE})",
-                ncols=100, position=1, leave=False, dynamic_ncols=True
+    try:
+        # "Lote" agora é virtual: BATCH_SIZE conclusões, só para governança/progresso
+        lote_idx = 1
+        t0 = time.time()
+        timeouts = 0
+        concluidos = 0
+        concluidos_total = 0
+        iniciar_pbar_lote(lote_idx, total_ips)
+
+        while em_voo or not ips_esgotados:
+            # Produtor: completa a janela com os próximos IPs
+            abandonados = {f for f in abandonados if not f.done()}
+            while not ips_esgotados and len(em_voo) + len(abandonados) < hosts_workers:
+                ip = next(proximos_ips, None)
+                if ip is None:
+                    ips_esgotados = True
+                    break
+                marca = [None]
+                future = pool.submit(
+                    _cronometrado, marca,
+                    verificar_host, ip, fabricantes, portas_workers, timeout_socket, {},
+                    verificar_cves=cve_inline, resolver_mac=False,
+                )
+                em_voo[future] = ip
+                inicio_host[future] = marca
+
+            if not em_voo and not abandonados:
+                break
+
+            # Consumidor: espera a 1ª conclusão, mas no máximo até o prazo
+            # do host mais antigo EM EXECUÇÃO (equivalente ao --host-timeout do nmap);
+            # host ainda na fila não corre prazo
+            prazo = gov.prazo_host(len(PORTAS_COMUNS))
+            iniciados = [m[0] for m in inicio_host.values() if m[0] is not None]
+            espera = max(0.0, min(iniciados) + prazo - time.time()) if iniciados else min(prazo, 0.5)
+            prontos, _ = wait(
+                [*em_voo, *abandonados], timeout=espera, return_when=FIRST_COMPLETED
             )
-
-            # Executor por lote permite ajustar hosts dinamicamente
-            with ThreadPoolExecutor(max_workers=hosts_workers) as executor:
-                tarefas = {
-                    executor.submit(
-                        verificar_host,
-                        ip,
-                        fabricantes,
-                        portas_workers,
-                        timeout_socket,
-                        {}
-                    ): ip for ip in batch_ips
-                }
-
-                for future in as_completed(tarefas):
-                    try:
-                        resultado = future.result(timeout=(timeout_socket * 2) + 5)
-                    except Exception as e:
-                        timeouts += 1
-                        ip_fut = tarefas[future]
-                        resultado = {
-                            "ip": ip_fut, "status": "OFFLINE", "nome": "N/D", "mac": "N/D",
-                            "fabricante": "N/D", "so": "N/D", "portas": [], "banners": [],
-                            "vulnerabilidades": [], "latencia": -1.0, "erro": str(e),
-                        }
-                    status_dict[resultado["ip"]] = resultado
-                    concluidos += 1
-                    pbar_lote.update(1)
-                    pbar_total.update(1)
-
-            pbar_lote.close()
+            for future in prontos:
+                if future not in em_voo:
+                    continue  # abandonado que enfim terminou: só libera a vaga
+                ip_fut = em_voo.pop(future)
+                t_host = inicio_host.pop(future)[0]
+                try:
+                    resultado = future.result()
+                    if resultado.status == "ONLINE":
+                        # só ONLINE: offline (~1 s de ping) puxaria o P99 e o prazo para baixo
+                        gov.latencias.registrar(time.time() - t_host)
+                except Exception as e:
+                    timeouts += 1
+                    resultado = HostResult.offline(ip_fut, str(e))
+                registrar_resultado(resultado)
+                concluidos += 1
+                concluidos_total += 1
+                pendentes_pbar += 1
+
+            # Hosts que estouraram o prazo: abandonados e contados como timeout
+            # (a thread segue até os timeouts internos de verificar_host)
+            agora = time.time()
+            vencidos = [
+                f for f, m in inicio_host.items() if m[0] is not None and agora - m[0] >= prazo
+            ]
+            for future in vencidos:
+                if not future.cancel():
+                    abandonados.add(future)
+                ip_fut = em_voo.pop(future)
+                inicio_host.pop(future)
+                timeouts += 1
+                registrar_resultado(HostResult.offline(ip_fut, f"timeout ({prazo:.1f}s)"))
+                concluidos += 1
+                concluidos_total += 1
+                pendentes_pbar += 1
+
+            fim_lote = concluidos >= pbar_lote.total or concluidos_total >= total_ips
+            if (
+                fim_lote
+                or pendentes_pbar >= max(1, hosts_workers // 2)
+                or time.monotonic() - ultimo_update_pbar >= 0.1
+            ):
+                descarregar_pbars()
+
+            if not fim_lote:
+                continue
+
+            # ======= Fechamento do lote virtual =======
             dur = time.time() - t0
+            descarregar_macs()
 
             # ======= Governança: decidir ajuste =======
             if ADAPTIVE:
                 ajustou, msg = gov.suggest(duracao_lote=dur, timeouts=timeouts, concluidos=concluidos)
                 if ajustou:
-                    # aplicar novos parâmetros
+                    # aplicar novos parâmetros (valem para as próximas submissões)
                     BATCH_SIZE = gov.batch
                     hosts_workers = gov.hosts
                     portas_workers = gov.portas
                     timeout_socket = gov.timeout
                     console.print(f"[yellow]Adaptando: {msg}[/yellow]")
 
+            if concluidos_total >= total_ips:
+                break
+            lote_idx += 1
+            t0 = time.time()
+            timeouts = 0
+            concluidos = 0
+            iniciar_pbar_lote(lote_idx, total_ips - concluidos_total)
+
     finally:
-        spinner_flag.set()
+        pool.shutdown(wait=False)
+        if saida_jsonl is not None:
+            saida_jsonl.close()
         try:
+            pbar_lote.close()
             pbar_total.close()
         except Exception:
             pass
 
-    # 8) CVEs (opcional e só com banners)
-    if not SKIP_CVE:
-        tem_banner = any(v.get("banners") for v in status_dict.values())
+    # 8.0) MAC/fabricante: ONLINE que sobraram sem lote fechado (ex.: Ctrl+C)
+    descarregar_macs()
+
+    # 8.1) Hostnames: DNS inverso só dos ONLINE, em lote e fora do scan
+    if config["resolve_hostname"]:
+        online = [ip for ip, h in status_dict.items() if h.status == "ONLINE"]
+        if online:
+            console.print(f"\n[cyan]Resolvendo hostnames ({len(online)} hosts)...[/cyan]")
+            for ip, nome in resolver_hostnames(online).items():
+                status_dict[ip].nome = nome
+
+    # 9) Junta a atualização NVD (se rodou em paralelo ao scan)
+    if nvd_future is not None:
+        if not nvd_future.done():
+            console.print("\n[cyan]Aguardando atualização da base NVD...[/cyan]")
+        erro_nvd = nvd_future.result()
+        for msg in nvd_mensagens:  # progresso guardado durante o scan
+            print(msg)
+        if erro_nvd is None:
+            console.print("[green]Base NVD atualizada com sucesso.[/green]")
+        else:
+            console.print(f"[red]Falha ao atualizar base NVD: {erro_nvd}[/red]")
+
+    # 10) CVEs pós-scan: só quando não deu para calcular no pipeline
+    if cve_inline:
+        console.print("\n[bold cyan]CVEs calculados durante o scan (CPE+faixa de versão).[/bold cyan]")
+    elif not SKIP_CVE:
+        tem_banner = any(v.banners for v in status_dict.values())
         if tem_banner:
             console.print("\n[bold cyan]Calculando CVEs (CPE+faixa de versão)...[/bold cyan]")
             try:
-                from cve import carregar_base_local_cves, verificar_vulnerabilidades_em_banners
+                from cve import carregar_base_local_cves, verificar_vulnerabilidades_em_lote
                 carregar_base_local_cves()
-                for host in status_dict.values():
-                    if host.get("banners"):
-                        confirmadas, suspeitas = verificar_vulnerabilidades_em_banners(
-                            host["banners"], detalhado=True, base_cves={}
-                        )
-                        host["vulnerabilidades"] = [
-                            *confirmadas, *[f"{c} (suspeita)" for c in suspeitas]
-                        ]
+                # todos os hosts numa consulta só: serviço repetido na rede = 1 busca
+                por_host = verificar_vulnerabilidades_em_lote(
+                    {ip: v.banners for ip, v in status_dict.items() if v.banners}
+                )
+                for ip, (confirmadas, suspeitas) in por_host.items():
+                    status_dict[ip].vulnerabilidades = [
+                        *confirmadas, *[f"{c} (suspeita)" for c in suspeitas]
+                    ]
             except Exception as e:
                 console.print(f"[red]Falha ao calcular CVEs: {e}[/red]")
         else:
@@ -461,12 +409,12 @@ def main():
     else:
         console.print("[yellow]config.skip_cve=1: verificação de CVEs desativada.[/yellow]")
 
-    # 9) Relatório
+    # 11) Relatório
     tabela = gerar_tabela(status_dict)
     console.print("\n[bold cyan]Resumo Final:[/bold cyan]")
     console.print(tabela)
 
-    # 10) CSV
+    # 12) CSV
     try:
         salvar = input("\nDeseja exportar o resultado para CSV? (s/n): ").strip().lower()
     except KeyboardInterrupt:
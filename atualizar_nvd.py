@@ -10,7 +10,8 @@ ocorrido há mais de `DIAS_ENTRE_ATUALIZACOES` dias.
 
 ## Funcionalidades
 - Verifica a data da última atualização da base
-- Baixa automaticamente os arquivos de anos faltantes
+- Baixa automaticamente os arquivos de anos faltantes (em paralelo, conexões reaproveitadas)
+- Revalida o feed do ano atual com GET condicional (ETag / Last-Modified): 304 => nada a baixar
 - Garante que os arquivos mais recentes estejam salvos localmente
 - Cria o diretório `nvd_data` se não existir
 
@@ -24,8 +25,13 @@ Luiz
 """
 
 import os
+import json
 import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ========== CONFIGURAÇÃO ========== #
 URL_BASE = "https://nvd.nist.gov/feeds/json/cve/1.1"
@@ -33,6 +39,11 @@ DIRETORIO = "nvd_data"
 DIAS_ENTRE_ATUALIZACOES = 5
 ANO_INICIAL = 2002
 ARQUIVO_LAST_CHECK = ".last_check"
+ARQUIVO_HTTP_META = ".http_meta.json"  # {arquivo: {"etag": ..., "last_modified": ...}}
+MAX_DOWNLOADS_PARALELOS = 8
+TIMEOUT_HTTP = (10, 60)  # (connect, leitura) em segundos
+LAST_CHECK = Path(DIRETORIO) / ARQUIVO_LAST_CHECK
+CHUNK_SIZE = 1 << 20  # 1 MiB por iteração/escrita (8 KiB gerava milhares de syscalls por arquivo)
 # ================================== #
 
 
@@ -43,102 +54,187 @@ def get_ano_atual():
     Retorna:
         int: Ano atual.
     """
-    return datetime.datetime.now().year
+    return datetime.date.today().year
 
 
 def caminho_last_check():
     """
-    Retorna o caminho absoluto do arquivo de controle `.last_check`.
+    Retorna o caminho do arquivo de controle `.last_check`.
 
     Retorna:
         str: Caminho completo.
     """
-    return os.path.join(DIRETORIO, ARQUIVO_LAST_CHECK)
+    return str(LAST_CHECK)
 
 
-def dias_desde_ultima_verificacao():
+def dias_desde_ultima_verificacao(log=print):
     """
-    Calcula o número de dias desde a última verificação.
+    Calcula o número de dias desde a última verificação (só datas, sem hora/fuso).
+    `log`: destino das mensagens (padrão: print).
 
     Retorna:
         float: Número de dias passados. Retorna infinito se não houver registro ou erro de leitura.
     """
     try:
-        with open(caminho_last_check(), "r") as f:
-            ultima = datetime.datetime.strptime(f.read().strip(), "%Y-%m-%d")
-            hoje = datetime.datetime.now()
-            return (hoje - ultima).days
+        ultima = datetime.date.fromisoformat(LAST_CHECK.read_text().strip())
+        return (datetime.date.today() - ultima).days
     except FileNotFoundError:
         return float("inf")
     except Exception as e:
-        print(f"[ERRO] Falha ao ler data da última verificação: {e}")
+        log(f"[ERRO] Falha ao ler data da última verificação: {e}")
         return float("inf")
 
 
-def registrar_verificacao():
+def registrar_verificacao(log=print):
     """
     Atualiza o arquivo `.last_check` com a data atual.
     """
     try:
-        with open(caminho_last_check(), "w") as f:
-            f.write(datetime.datetime.now().strftime("%Y-%m-%d"))
+        LAST_CHECK.write_text(datetime.date.today().isoformat())
     except Exception as e:
-        print(f"[ERRO] Falha ao registrar última verificação: {e}")
+        log(f"[ERRO] Falha ao registrar última verificação: {e}")
 
 
-def baixar_arquivo(ano: int):
+def carregar_http_meta():
+    """
+    Lê os validadores HTTP (ETag/Last-Modified) salvos por arquivo.
+
+    Retorna:
+        dict: {nome_arquivo: {"etag": str, "last_modified": str}} (vazio se não houver).
+    """
+    try:
+        with open(os.path.join(DIRETORIO, ARQUIVO_HTTP_META), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_http_meta(meta, log=print):
+    """
+    Grava os validadores HTTP por arquivo em `.http_meta.json`.
+    """
+    try:
+        with open(os.path.join(DIRETORIO, ARQUIVO_HTTP_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+    except Exception as e:
+        log(f"[ERRO] Falha ao registrar metadados HTTP: {e}")
+
+
+def criar_sessao():
+    """
+    Sessão HTTP compartilhada entre os downloads: TCP/TLS com a NVD
+    reaproveitados entre os anos (pool do tamanho do paralelismo) e
+    retentativa com backoff exponencial em falhas transitórias (429/5xx, conexão).
+
+    Retorna:
+        requests.Session: Sessão configurada.
+    """
+    sessao = requests.Session()
+    retentativas = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=MAX_DOWNLOADS_PARALELOS,
+        pool_maxsize=MAX_DOWNLOADS_PARALELOS,
+        max_retries=retentativas,
+    )
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+def baixar_arquivo(ano: int, meta=None, sessao=None, log=print):
     """
     Realiza o download do arquivo CVE para o ano especificado.
 
     Parâmetros:
         ano (int): Ano desejado da base CVE.
+        meta (dict): Validadores HTTP por arquivo (atualizado in-place).
+        sessao (requests.Session): Sessão a reutilizar (opcional).
+        log (callable): Destino das mensagens de progresso (padrão: print).
 
     Ação:
-        - Se o arquivo já existir localmente, ele será ignorado.
-        - Caso contrário, será baixado da NVD.
+        - Anos anteriores já baixados são ignorados (a NVD só altera o feed do ano atual).
+        - O ano atual, se já existir, é revalidado com GET condicional: 304 => mantém o local.
+        - Caso contrário, é baixado da NVD (para `.part` e renomeado ao final).
     """
+    meta = {} if meta is None else meta
     nome_arquivo = f"nvdcve-1.1-{ano}.json.gz"
     url = f"{URL_BASE}/{nome_arquivo}"
     caminho = os.path.join(DIRETORIO, nome_arquivo)
 
+    headers = {}
     if os.path.exists(caminho):
-        print(f"[✓] {nome_arquivo} já existe. Pulando.")
-        return
-
-    print(f"[↓] Baixando {nome_arquivo}...")
+        if ano < get_ano_atual():
+            log(f"[✓] {nome_arquivo} já existe. Pulando.")
+            return
+        validadores = meta.get(nome_arquivo) or {}
+        if validadores.get("etag"):
+            headers["If-None-Match"] = validadores["etag"]
+        if validadores.get("last_modified"):
+            headers["If-Modified-Since"] = validadores["last_modified"]
+
+    log(f"[↓] {'Revalidando' if headers else 'Baixando'} {nome_arquivo}...")
+    temporario = caminho + ".part"
     try:
-        r = requests.get(url, stream=True, timeout=30)
-        r.raise_for_status()
-        with open(caminho, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"[✔] {nome_arquivo} salvo com sucesso.")
+        # `with`: a resposta (stream) devolve a conexão ao pool da sessão
+        # também nos retornos antecipados (304) e nos erros HTTP
+        with (sessao or requests).get(url, stream=True, timeout=TIMEOUT_HTTP, headers=headers) as r:
+            if r.status_code == 304:
+                log(f"[✓] {nome_arquivo} sem alterações no servidor. Pulando.")
+                return
+            r.raise_for_status()
+            with open(temporario, "wb", buffering=CHUNK_SIZE) as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(temporario, caminho)
+            meta[nome_arquivo] = {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+            }
+        log(f"[✔] {nome_arquivo} salvo com sucesso.")
     except Exception as e:
-        print(f"[ERRO] Falha ao baixar {nome_arquivo}: {e}")
+        log(f"[ERRO] Falha ao baixar {nome_arquivo}: {e}")
+        try:
+            os.remove(temporario)  # sem `.part` pela metade para trás
+        except OSError:
+            pass
 
 
-def atualizar_base_nvd():
+def atualizar_base_nvd(log=print):
     """
     Função principal que coordena a atualização da base NVD.
+    `log` recebe cada mensagem de progresso (padrão: print). Em segundo plano
+    (ex.: durante o scan, com barras tqdm na tela) passe um coletor e mostre
+    as mensagens depois.
 
     - Verifica se o intervalo mínimo entre atualizações foi respeitado.
-    - Caso necessário, realiza o download de todos os arquivos desde 2002 até o ano atual.
+    - Caso necessário, realiza o download de todos os arquivos desde 2002 até o ano atual,
+      até `MAX_DOWNLOADS_PARALELOS` anos em paralelo numa única sessão HTTP.
     - Registra a nova data de atualização ao final.
     """
     os.makedirs(DIRETORIO, exist_ok=True)
 
-    dias_passados = dias_desde_ultima_verificacao()
+    dias_passados = dias_desde_ultima_verificacao(log)
     if dias_passados < DIAS_ENTRE_ATUALIZACOES:
-        print(f"[i] Última verificação foi há {dias_passados} dias.")
-        print(f"[→] Nenhuma atualização necessária. Aguarde mais {DIAS_ENTRE_ATUALIZACOES - dias_passados} dias.")
+        log(f"[i] Última verificação foi há {dias_passados} dias.")
+        log(f"[→] Nenhuma atualização necessária. Aguarde mais {DIAS_ENTRE_ATUALIZACOES - dias_passados} dias.")
         return
 
     ano_atual = get_ano_atual()
-    for ano in range(ANO_INICIAL, ano_atual + 1):
-        baixar_arquivo(ano)
-
-    registrar_verificacao()
-    print("\n[✓] Atualização da base NVD finalizada.")
+    meta = carregar_http_meta()
+    anos = range(ANO_INICIAL, ano_atual + 1)
+    with criar_sessao() as sessao, ThreadPoolExecutor(
+        max_workers=min(MAX_DOWNLOADS_PARALELOS, len(anos))
+    ) as ex:
+        list(ex.map(lambda ano: baixar_arquivo(ano, meta, sessao, log), anos))
+
+    salvar_http_meta(meta, log)
+    registrar_verificacao(log)
+    log("\n[✓] Atualização da base NVD finalizada.")
 
 
 if __name__ == "__main__":
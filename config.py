@@ -18,6 +18,7 @@
   "tcp_only": bool,           # leve=True,  completo=False
   "skip_cve": bool,           # leve=True,  completo=False
   "skip_nvd_update": bool,    # leve=True,  completo=False
+  "results_jsonl": str,       # JSONL incremental ("" desativa)
   "mode": "leve"|"completo"|"auto",
   "adaptive": bool            # True => __main__ pode reduzir mais se precisar
 }
@@ -28,6 +29,7 @@
 - VH_MAX_HOSTS_WORKERS, VH_MAX_PORTS_WORKERS, VH_TIMEOUT_SOCKET
 - VH_MAX_SOCKETS, VH_BATCH_SIZE
 - VH_RESOLVE_HOSTNAME, VH_TCP_ONLY, VH_SKIP_CVE, VH_SKIP_NVD_UPDATE
+- VH_RESULTS_JSONL: arquivo JSONL gravado host a host, recriado a cada execução (default: resultados_scan.jsonl; "" desativa)
 """
 
 from __future__ import annotations
@@ -35,6 +37,7 @@ from __future__ import annotations
 import os
 import sys
 import platform
+from functools import lru_cache
 from typing import Dict
 
 # ============================
@@ -67,8 +70,10 @@ def _isatty() -> bool:
     except Exception:
         return False
 
+_IS_WIN = platform.system().lower().startswith("win")
+
 def _is_windows() -> bool:
-    return platform.system().lower().startswith("win")
+    return _IS_WIN
 
 
 # ============================
@@ -197,6 +202,15 @@ def _overrides(p: Dict, is_win: bool) -> Dict:
 # ============================
 
 def auto_configurar() -> Dict[str, object]:
+    """
+    Config efetiva do processo. Calculada (e perguntada/logada) só na 1ª
+    chamada; as seguintes devolvem uma cópia do mesmo resultado, sem reler
+    ENV nem perguntar o modo de novo.
+    """
+    return dict(_auto_configurar())
+
+@lru_cache(maxsize=1)
+def _auto_configurar() -> Dict[str, object]:
     is_win = _is_windows()
 
     modo = (os.getenv("VH_MODE") or "auto").strip().lower()
@@ -243,6 +257,8 @@ def auto_configurar() -> Dict[str, object]:
         "skip_cve": bool(preset["skip_cve"]),
         "skip_nvd_update": bool(preset["skip_nvd_update"]),
 
+        "results_jsonl": os.getenv("VH_RESULTS_JSONL", "resultados_scan.jsonl").strip(),
+
         "mode": modo,
         "adaptive": bool(preset.get("adaptive", True)),
     }
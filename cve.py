@@ -7,19 +7,23 @@ com **cache em disco** e **índice rápido**.
 
 ## O que este módulo faz
 - Lê JSONs da NVD (pasta `nvd_data/`).
-- Indexa por (vendor, product) guardando:
-  - `anyVersion` (qualquer versão),
+- Indexa por (vendor, product) uma tupla por CVE com:
+  - `anyVersion` (qualquer versão, bit em `flags`),
   - `exactVersion` (quando o CPE vem com versão **exata**),
-  - `versionRules` (faixas start/end inclusive/exclusive).
+  - faixas start/end inclusive/exclusive.
 - Extrai (produto, versão) de banners, normaliza para a taxonomia NVD,
   e confirma CVEs por versão.
 
 ## Requisitos
 - packaging>=24.0
+- orjson (opcional; acelera a construção do índice)
+- isal (opcional; descompressão gzip mais rápida dos feeds)
+- ijson (opcional; lê os feeds em streaming, pico de RAM baixo; NVD_INDEX_STREAM=0 desliga)
 
 ## API (compatível)
 - carregar_base_local_cves(diretorio="nvd_data", usar_cache=True)
 - verificar_vulnerabilidades_em_banners(banners, base_cves=None, detalhado=False)
+- verificar_vulnerabilidades_em_lote({host: banners}, detalhado=True)
 """
 
 from __future__ import annotations
@@ -28,20 +32,46 @@ import os
 import re
 import json
 import gzip
-import pickle
+import sys
+import mmap
+import threading
+import struct
+import marshal
+import multiprocessing
+from collections.abc import Mapping
 from typing import Dict, List, Tuple, Iterable, Optional
 from functools import lru_cache
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from packaging.version import Version, InvalidVersion
 
+try:
+    import orjson  # parser em Rust, bem mais rápido nos feeds grandes
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import ijson  # streaming dos feeds (desligável por NVD_INDEX_STREAM=0)
+except ImportError:  # opcional
+    ijson = None
+
+try:
+    from isal import igzip as _gzip  # ISA-L: mesmo formato, descompressão SIMD
+except ImportError:  # opcional
+    _gzip = gzip
+
 # ==============================
 # Configs
 # ==============================
 
 DIRETORIO_NVD = os.environ.get("NVD_DIR", "nvd_data")
-NVD_INDEX_PKL = os.environ.get("NVD_INDEX_PKL", os.path.join(DIRETORIO_NVD, "nvd_index.pkl"))
+NVD_INDEX_CACHE = os.environ.get("NVD_INDEX_CACHE", os.path.join(DIRETORIO_NVD, "nvd_index.marshal"))
 NVD_INDEX_MAX_YEARS = int(os.environ.get("NVD_INDEX_MAX_YEARS", "5"))  # anos recentes a considerar
 CPE_PART_ALLOWED = os.environ.get("CPE_PART_ALLOWED", "a")  # "a","o","h" ou "" p/ todos
+NVD_INDEX_STREAM = os.environ.get("NVD_INDEX_STREAM", "1") == "1"  # ijson (se instalado); 0 = documento inteiro
+NVD_INDEX_WORKERS = int(os.environ.get("NVD_INDEX_WORKERS", "0"))  # processos p/ indexar; 0 = CPUs disponíveis
 
 # ==============================
 # Normalização e parsing
@@ -65,6 +95,29 @@ MAP_NORMALIZACAO: Dict[str, Tuple[str, str]] = {
     "dovecot": ("dovecot", "dovecot"),
 }
 
+# Padrões compilados uma vez (banner, versão numérica, ano no nome do feed).
+# Quantificadores limitados: sem âncora ^ (o produto pode vir no meio, ex.:
+# "Server: Apache/2.4"), então cada posição de início custa no máx. ~64 passos
+# em vez de varrer o resto do token (banner longo/adversarial era O(n²)).
+_RE_NOME_VERSAO = re.compile(
+    r'([A-Za-z0-9\-_]{1,64})[/\s]v?([0-9]{1,8}(?:\.[0-9a-z]{1,16}){0,3}(?:[-_][0-9a-z\.]{1,32})?)',
+    re.IGNORECASE,
+)
+_RE_NOME_UNDERSCORE_VERSAO = re.compile(r'([A-Za-z0-9\-_]{1,64})_([0-9]{1,8}[0-9a-zA-Z\.\-]{0,32})')
+_RE_VERSAO_NUMERICA = re.compile(r'^([0-9]+(?:\.[0-9]+){0,3})')
+_RE_ANO = re.compile(r'(\d{4})')
+# cpe:2.3:<part>:<vendor>:<product>:<version>[:...] -> só os 4 campos usados
+_RE_CPE23 = re.compile(r'cpe:2\.3:([^:]*):([^:]*):([^:]*):([^:]*)')  # .match: ancorado no início
+
+# Prefixos compactos (sem '-'/'_') -> (vendor, product), e UMA alternação
+# ancorada com os mais longos primeiro (casa igual ao laço por startswith)
+MAP_NORMALIZACAO_COMPACTO: Dict[str, Tuple[str, str]] = {
+    k.replace("-", "").replace("_", ""): vp for k, vp in MAP_NORMALIZACAO.items()
+}
+_RE_PREFIXO_PRODUTO = re.compile(
+    "|".join(re.escape(k) for k in sorted(MAP_NORMALIZACAO_COMPACTO, key=len, reverse=True))
+)
+
 def _clean(s: str) -> str:
     return (s or "").strip().lower()
 
@@ -75,9 +128,9 @@ def normalizar_produto(nome: str) -> Tuple[str, str]:
     """
     base = _clean(nome)
     compact = base.replace("-", "").replace("_", "")
-    for k, vp in MAP_NORMALIZACAO.items():
-        if compact.startswith(k.replace("-", "")):
-            return vp
+    m = _RE_PREFIXO_PRODUTO.match(compact)
+    if m:
+        return MAP_NORMALIZACAO_COMPACTO[m.group(0)]
     return (base.replace(" ", "_"), base.replace(" ", "_"))
 
 def extrair_nome_versao_banner(banner: str) -> Optional[Tuple[str, str]]:
@@ -93,48 +146,82 @@ def extrair_nome_versao_banner(banner: str) -> Optional[Tuple[str, str]]:
     b = banner.strip()
 
     # nome/versao ou nome vX.Y.Z, aceitando sufixos distro (ex.: -1ubuntu1)
-    m = re.search(r'([A-Za-z0-9\-_]+)[/\s]v?([0-9]+(?:\.[0-9a-z]+){0,3}(?:[-_][0-9a-z\.]+)?)',
-                  b, flags=re.IGNORECASE)
+    m = _RE_NOME_VERSAO.search(b)
     if m:
         return (_clean(m.group(1)), m.group(2))
 
     # nome_versao (ex.: OpenSSH_8.2p1)
-    m = re.search(r'([A-Za-z0-9\-_]+)_([0-9]+[0-9a-zA-Z\.\-]*)', b)
+    m = _RE_NOME_UNDERSCORE_VERSAO.search(b)
     if m:
         return (_clean(m.group(1)), m.group(2))
 
     return None
 
+def _extrair_em_lote(banners: List[str]) -> List[Optional[Tuple[str, str]]]:
+    """
+    `extrair_nome_versao_banner` para vários banners de uma vez: um único
+    `finditer` sobre os banners unidos por NUL, e o padrão `_` só para os que
+    ficaram sem match. NUL não entra em nenhuma classe de `_RE_NOME_VERSAO`,
+    então nenhum match atravessa banners e o 1º match de cada trecho é o mesmo
+    que `search` daria no banner isolado.
+    """
+    resultado: List[Optional[Tuple[str, str]]] = [None] * len(banners)
+    inicios: List[int] = []
+    pos = 0
+    for b in banners:
+        inicios.append(pos)
+        pos += len(b) + 1
+
+    for m in _RE_NOME_VERSAO.finditer("\0".join(banners)):
+        i = bisect_right(inicios, m.start()) - 1
+        if resultado[i] is None:
+            resultado[i] = (_clean(m.group(1)), m.group(2))
+
+    for i, b in enumerate(banners):
+        if resultado[i] is None and b:
+            m = _RE_NOME_UNDERSCORE_VERSAO.search(b)
+            if m:
+                resultado[i] = (_clean(m.group(1)), m.group(2))
+    return resultado
+
 # ==============================
 # CPE e comparação de versões
 # ==============================
 
+def _campos_cpe23(cpe: str) -> Optional[Tuple[str, str, str, str]]:
+    """(part, vendor, product, version) sem `split` da URI inteira (laço do índice)."""
+    m = _RE_CPE23.match(cpe) if cpe else None
+    return m.groups() if m else None
+
 def parse_cpe23(cpe: str) -> Optional[Dict[str, str]]:
     """
     ## parse_cpe23
     "cpe:2.3:a:vendor:product:version:update:..." -> dict mínimo.
     """
-    partes = (cpe or "").split(":")
-    if len(partes) < 6:
+    campos = _campos_cpe23(cpe)
+    if not campos:
         return None
     return {
-        "part": partes[2],    # a=application, o=os, h=hardware
-        "vendor": partes[3],
-        "product": partes[4],
-        "version": partes[5],
+        "part": campos[0],    # a=application, o=os, h=hardware
+        "vendor": campos[1],
+        "product": campos[2],
+        "version": campos[3],
     }
 
+@lru_cache(maxsize=8192)
 def _to_version(v: Optional[str]) -> Optional[Version]:
     """
     ## _to_version
     Converte para Version; se inválida (ex.: 8.2p1), tenta heurística numérica.
+    Memoizada (função pura, Version é imutável): as mesmas strings de versão
+    se repetem entre entradas NVD, buckets e hosts.
     """
     if not v:
         return None
     try:
         return Version(v)
     except InvalidVersion:
-        m = re.match(r'^([0-9]+(?:\.[0-9]+){0,3})', v)
+        m = _RE_VERSAO_NUMERICA.match(v)
         if m:
             try:
                 return Version(m.group(1))
@@ -142,20 +229,9 @@ def _to_version(v: Optional[str]) -> Optional[Version]:
                 return None
         return None
 
-def comparar_versao(ver_alvo: str, regra: Dict[str, Optional[str]]) -> bool:
-    """
-    ## comparar_versao
-    Compara ver_alvo com faixa (start/end, inclusive/exclusive).
-    """
-    va = _to_version(ver_alvo)
-    if va is None:
-        return False
-
-    vsi = _to_version(regra.get("versionStartIncluding"))
-    vse = _to_version(regra.get("versionStartExcluding"))
-    vei = _to_version(regra.get("versionEndIncluding"))
-    vee = _to_version(regra.get("versionEndExcluding"))
-
+def _na_faixa(va: Version, vsi: Optional[Version], vse: Optional[Version],
+              vei: Optional[Version], vee: Optional[Version]) -> bool:
+    """Faixa start/end (inclusive/exclusive), todos os lados já parseados."""
     if vsi and va < vsi:
         return False
     if vse and va <= vse:
@@ -166,39 +242,153 @@ def comparar_versao(ver_alvo: str, regra: Dict[str, Optional[str]]) -> bool:
         return False
     return True
 
+def _versao_na_faixa(va: Version, regra: Dict[str, Optional[str]]) -> bool:
+    return _na_faixa(
+        va,
+        _to_version(regra.get("versionStartIncluding")),
+        _to_version(regra.get("versionStartExcluding")),
+        _to_version(regra.get("versionEndIncluding")),
+        _to_version(regra.get("versionEndExcluding")),
+    )
+
+def comparar_versao(ver_alvo: str, regra: Dict[str, Optional[str]]) -> bool:
+    """
+    ## comparar_versao
+    Compara ver_alvo com faixa (start/end, inclusive/exclusive).
+    """
+    va = _to_version(ver_alvo)
+    if va is None:
+        return False
+    return _versao_na_faixa(va, regra)
+
+def _iguais(va: Optional[Version], v1: str, v2: str, b: Optional[Version] = None) -> bool:
+    """`versoes_iguais` com o lado do alvo (`va`) já parseado (e `b` = v2 parseado, se houver)."""
+    if b is None:
+        b = _to_version(v2)
+    if va is not None and b is not None:
+        return va == b
+    return (v1 or "").strip() == (v2 or "").strip()
+
 def versoes_iguais(v1: str, v2: str) -> bool:
     """
     ## versoes_iguais
     Compara versões tratando sufixos não semânticos (ex.: '8.2p1' ~ '8.2').
     Tenta semântico; se não der, compara literal.
     """
-    a, b = _to_version(v1), _to_version(v2)
-    if a is not None and b is not None:
-        return a == b
-    return (v1 or "").strip() == (v2 or "").strip()
+    return _iguais(_to_version(v1), v1, v2)
 
 # ==============================
-# Cache do índice (pickle)
+# Entradas do índice
 # ==============================
 
+# Uma tupla por CVE (~8 slots) em vez de dict + dict aninhado de regras:
+#   (cve, flags, exactVersion|None, vsi, vse, vei, vee, arquivo)
+# vsi/vse/vei/vee = versionStart/End Including/Excluding; `arquivo` = feed de
+# origem (invalidação incremental do cache).
+E_CVE, E_FLAGS, E_EXATA, E_VSI, E_VSE, E_VEI, E_VEE, E_ARQUIVO = range(8)
+ANY_VERSION = 1  # CPE sem versão (*, -): vale para qualquer versão
+TEM_FAIXA = 2    # ao menos um limite start/end
+
+# ==============================
+# Cache do índice (marshal + mmap)
+# ==============================
+
+# O formato do marshal muda entre versões do Python: cache de outra versão é ignorado
+_CACHE_CABECALHO = f"vh-nvd-index-v3 py{sys.version_info[0]}.{sys.version_info[1]} m{marshal.version}\n".encode()
+_TAM_META = struct.Struct("<Q")
+
+# Layout do arquivo:
+#   cabeçalho | <Q tamanho da meta> | meta | buckets
+#   meta    = marshal {"part", "manifesto", "tabela": {(vendor, product): (offset, tamanho)}}
+#   buckets = um marshal (lista de tuplas de entrada) por chave, concatenados
+# Na carga só a meta vira objeto Python; cada bucket é desserializado do mmap
+# na 1ª consulta daquela chave (o resto fica em disco / page cache).
+
+class IndiceCPE(Mapping):
+    """
+    Índice CPE lido do cache sob demanda: {(vendor, product): [entradas]}.
+    Mapping somente-leitura; buckets materializados ficam em memória.
+    """
+
+    def __init__(self, tabela: Dict[Tuple[str, str], Tuple[int, int]], mm: mmap.mmap, base: int):
+        self._tabela = tabela
+        self._mm = mm
+        self._base = base
+        self._buckets: Dict[Tuple[str, str], List[Tuple]] = {}
+
+    def __getitem__(self, key: Tuple[str, str]) -> List[Tuple]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            offset, tamanho = self._tabela[key]
+            ini = self._base + offset
+            # corrida entre threads só desserializa duas vezes (mesmo resultado)
+            bucket = self._buckets[key] = marshal.loads(self._mm[ini:ini + tamanho])
+        return bucket
+
+    def __iter__(self):
+        return iter(self._tabela)
+
+    def __len__(self) -> int:
+        return len(self._tabela)
+
+    def __contains__(self, key) -> bool:
+        return key in self._tabela
+
+    def fechar(self) -> None:
+        """Solta o mmap (necessário no Windows antes de substituir o arquivo)."""
+        self._mm.close()
+
 def _ano_do_arquivo(nome: str) -> Optional[int]:
-    m = re.search(r'(\d{4})', nome or "")
+    m = _RE_ANO.search(nome or "")
     return int(m.group(1)) if m else None
 
-def _carregar_indice_cache() -> Optional[Dict[Tuple[str, str], List[Dict]]]:
+def _carregar_indice_cache() -> Optional[Dict]:
+    """
+    Lê o cache em disco -> {"part", "manifesto", "indice": IndiceCPE}.
+    `marshal` só reconstrói tipos básicos (dict/list/tuple/str/bool/None):
+    mais rápido que pickle e sem executar opcodes de um arquivo adulterado.
+    """
     try:
-        if os.path.exists(NVD_INDEX_PKL):
-            with open(NVD_INDEX_PKL, "rb") as f:
-                return pickle.load(f)
-    except Exception:
+        with open(NVD_INDEX_CACHE, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # ausente / vazio
+        return None
+    try:
+        ini = len(_CACHE_CABECALHO)
+        if mm[:ini] != _CACHE_CABECALHO:
+            raise ValueError("cabeçalho")
+        (tam_meta,) = _TAM_META.unpack_from(mm, ini)
+        ini += _TAM_META.size
+        meta = marshal.loads(mm[ini:ini + tam_meta])
+        return {
+            "part": meta["part"],
+            "manifesto": meta["manifesto"],
+            "indice": IndiceCPE(meta["tabela"], mm, ini + tam_meta),
+        }
+    except (EOFError, ValueError, TypeError, KeyError, struct.error):
+        mm.close()
         return None
-    return None
 
-def _salvar_indice_cache(indice: Dict[Tuple[str, str], List[Dict]]) -> None:
+def _salvar_indice_cache(cache: Dict) -> None:
     try:
-        os.makedirs(os.path.dirname(NVD_INDEX_PKL), exist_ok=True)
-        with open(NVD_INDEX_PKL, "wb") as f:
-            pickle.dump(indice, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(NVD_INDEX_CACHE) or ".", exist_ok=True)
+        tabela: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        buckets: List[bytes] = []
+        offset = 0
+        for key, entries in cache["indice"].items():
+            blob = marshal.dumps(entries)
+            tabela[key] = (offset, len(blob))
+            buckets.append(blob)
+            offset += len(blob)
+        meta = marshal.dumps({"part": cache["part"], "manifesto": cache["manifesto"], "tabela": tabela})
+
+        temporario = NVD_INDEX_CACHE + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(_CACHE_CABECALHO)
+            f.write(_TAM_META.pack(len(meta)))
+            f.write(meta)
+            f.writelines(buckets)
+        os.replace(temporario, NVD_INDEX_CACHE)
     except Exception:
         pass
 
@@ -206,16 +396,18 @@ def _salvar_indice_cache(indice: Dict[Tuple[str, str], List[Dict]]) -> None:
 # Iteração de nós (nodes/children)
 # ==============================
 
-def _iter_cpe_matches(nodes: List[dict]):
-    """Percorre `nodes` e `children` recursivamente, gerando matches de CPE."""
+def _coletar_cpe_matches(nodes: List[dict], out: List[dict]) -> None:
+    """
+    Percorre `nodes` e `children` (pilha, sem recursão) e acumula os matches
+    de CPE em `out`: `extend` por nó em vez de um `yield` por match.
+    """
     if not nodes:
         return
     stack = list(nodes)
     while stack:
         node = stack.pop()
-        for m in node.get("cpe_match", []) or []:
-            yield m
-        childs = node.get("children") or []
+        out.extend(node.get("cpe_match") or ())
+        childs = node.get("children")
         if childs:
             stack.extend(childs)
 
@@ -223,148 +415,332 @@ def _iter_cpe_matches(nodes: List[dict]):
 # Construção do índice CPE
 # ==============================
 
-@lru_cache(maxsize=1)
-def construir_indice_cpe(diretorio: str = DIRETORIO_NVD) -> Dict[Tuple[str, str], List[Dict]]:
+def _ler_json(caminho: str):
+    """Lê o feed inteiro em bytes (gz descomprimido de uma vez) e parseia com orjson, se houver."""
+    with open(caminho, "rb") as f:
+        bruto = f.read()
+    if caminho.endswith(".gz"):
+        bruto = _gzip.decompress(bruto)
+    if orjson is not None:
+        return orjson.loads(bruto)
+    return json.loads(bruto)
+
+def _itens_streaming(caminho: str):
     """
-    ## construir_indice_cpe
-    Gera: { (vendor, product): [ { 'cve', 'anyVersion', 'exactVersion'?, 'versionRules' } ...] }
+    CVEs do feed um a um via ijson (backend C yajl2): memória ~constante em
+    vez do documento inteiro (centenas de MB descomprimido).
+    Feed corrompido no meio => para ali (fica o que já foi lido).
+    """
+    abrir = _gzip.open if caminho.endswith(".gz") else open
+    for prefixo in ("CVE_Items.item", "vulnerabilities.item"):  # NVD 1.1 / 2.0
+        lidos = 0
+        try:
+            with abrir(caminho, "rb") as f:
+                for item in ijson.items(f, prefixo):
+                    lidos += 1
+                    yield item
+        except Exception:
+            return
+        if lidos:
+            return
+
+def _itens_do_feed(caminho: str):
+    """Itens CVE do feed: streaming (ijson, se instalado) ou documento inteiro (orjson/json)."""
+    if NVD_INDEX_STREAM and ijson is not None:
+        return _itens_streaming(caminho)
+    dados = _ler_json(caminho)
+    return dados.get("CVE_Items") or dados.get("vulnerabilities") or []
+
+def _indexar_arquivo(caminho: str, part_filter: str) -> Dict[Tuple[str, str], List[Tuple]]:
+    """
+    ## _indexar_arquivo
+    Índice parcial de UM feed NVD (gzip + json.load + varredura dos CPEs).
+    Função de módulo (picklável) para rodar em processo separado.
+    """
+    indice: Dict[Tuple[str, str], List[Tuple]] = {}
+    caminho = sys.intern(caminho)
+    try:
+        itens = _itens_do_feed(caminho)
+    except Exception:
+        return indice
 
-    Otimizações:
-    - Cache pickle (nvd_index.pkl).
-    - Recorte por anos (`NVD_INDEX_MAX_YEARS`).
-    - Filtro por part (default "a").
+    matches: List[dict] = []
+    for item in itens:
+        # Layouts suportados
+        if "cve" in item:
+            cve_id = item.get("cve", {}).get("CVE_data_meta", {}).get("ID", "")
+            nodes = item.get("configurations", {}).get("nodes", [])
+        else:
+            vuln = item.get("cve") or item.get("vuln") or {}
+            cve_id = (vuln.get("id")
+                      or vuln.get("CVE_data_meta", {}).get("ID", "")
+                      or item.get("id", ""))
+            nodes = item.get("configurations", {}).get("nodes", [])
+
+        # ids/vendor/product se repetem muito no corpus: uma cópia só (e o
+        # marshal grava como interned, então vale também no cache quente)
+        cve_id = sys.intern(cve_id)
+        matches.clear()
+        _coletar_cpe_matches(nodes, matches)
+        for match in matches:
+            if not match.get("vulnerable", False):
+                continue
+            cpe_str = match.get("cpe23Uri") or match.get("criteria") or ""
+            cpe = _campos_cpe23(cpe_str)
+            if not cpe:
+                continue
+            part, vendor, product, versao_cpe = cpe
+
+            if part_filter and part != part_filter:
+                continue
+
+            key = (sys.intern(vendor), sys.intern(product))
+            vsi = match.get("versionStartIncluding") or None
+            vse = match.get("versionStartExcluding") or None
+            vei = match.get("versionEndIncluding") or None
+            vee = match.get("versionEndExcluding") or None
+            any_version = versao_cpe in ("*", "-", "")
+            has_range = bool(vsi or vse or vei or vee)
+
+            # Se vier versão exata E sem faixa -> tratar como igualdade
+            exact_version = None
+            if not any_version and not has_range:
+                exact_version = versao_cpe
+
+            flags = (ANY_VERSION if any_version else 0) | (TEM_FAIXA if has_range else 0)
+            entry = (cve_id, flags, exact_version, vsi, vse, vei, vee, caminho)
+            indice.setdefault(key, []).append(entry)
+
+    return indice
+
+
+def _cpus_disponiveis() -> int:
+    """CPUs que o processo pode usar (afinidade/cgroup no Linux), não as da máquina."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:  # Windows/macOS
+        return os.cpu_count() or 1
+
+
+def _indices_parciais(caminhos: List[str], part_filter: str):
     """
-    cache = _carregar_indice_cache()
-    if cache:
-        return cache
+    Índices parciais na ordem de `caminhos`. Com 2+ arquivos, gzip+json.load
+    (CPU puro, preso ao GIL) vão para um ProcessPoolExecutor; se o pool não
+    puder ser criado, cai no serial.
+    Workers via "spawn": o índice pode ser (re)construído numa thread de fundo
+    enquanto o scan roda, e `fork` num processo multithread herda locks
+    travados (stdio, logging, pools) e pode deadlockar o filho.
+    """
+    workers = min(NVD_INDEX_WORKERS or _cpus_disponiveis(), len(caminhos))
+    if workers > 1:
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+                return list(ex.map(_indexar_arquivo, caminhos, [part_filter] * len(caminhos)))
+        except (OSError, RuntimeError, BrokenProcessPool):
+            pass
+    return [_indexar_arquivo(c, part_filter) for c in caminhos]
+
 
-    indice: Dict[Tuple[str, str], List[Dict]] = {}
-    if not os.path.exists(diretorio):
-        _salvar_indice_cache(indice)
+def _manifesto_feeds(diretorio: str, limiar: int) -> Dict[str, Tuple[int, int]]:
+    """
+    {feed: (mtime_ns, tamanho)} dos feeds .json/.json.gz dentro do recorte de
+    anos; o carimbo muda quando o arquivo é rebaixado.
+    `os.scandir` (pilha, sem seguir symlinks de pasta, como o `os.walk`):
+    nome e tipo vêm da própria listagem, e só os feeds que passam pelo filtro
+    de nome/ano custam um `stat`.
+    """
+    manifesto: Dict[str, Tuple[int, int]] = {}
+    pendentes = [diretorio] if os.path.isdir(diretorio) else []
+    while pendentes:
+        try:
+            it = os.scandir(pendentes.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pendentes.append(entry.path)
+                    continue
+                nome = entry.name
+                if not nome.endswith((".json", ".json.gz")):
+                    continue
+
+                ano = _ano_do_arquivo(nome)
+                if ano and ano < limiar:
+                    continue
+
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                manifesto[entry.path] = (st.st_mtime_ns, st.st_size)
+    return manifesto
+
+# Índice do processo: (diretorio, índice). Hit = uma leitura de global, sem
+# lock; o lock só serializa a 1ª construção (chamadas simultâneas esperam
+# a mesma construção em vez de cada uma montar o seu índice).
+_INDICE: Optional[Tuple[str, Mapping[Tuple[str, str], List[Tuple]]]] = None
+_INDICE_LOCK = threading.Lock()
+
+def construir_indice_cpe(diretorio: str = DIRETORIO_NVD) -> Mapping[Tuple[str, str], List[Tuple]]:
+    """
+    ## construir_indice_cpe
+    Índice CPE do processo (construído/carregado uma vez por `diretorio`).
+    `construir_indice_cpe.cache_clear()` força recarga na próxima chamada
+    (e descarta as memos derivadas: `_bucket_parseado`, `_casar_cpe`).
+    """
+    global _INDICE
+    atual = _INDICE
+    if atual is not None and atual[0] == diretorio:
+        return atual[1]
+    with _INDICE_LOCK:
+        atual = _INDICE
+        if atual is not None and atual[0] == diretorio:
+            return atual[1]
+        indice = _montar_indice_cpe(diretorio)
+        if atual is not None:
+            _limpar_memos()  # outro índice: buckets/casamentos do anterior não valem
+        _INDICE = (diretorio, indice)
         return indice
 
-    ano_atual = datetime.now().year
-    limiar = ano_atual - NVD_INDEX_MAX_YEARS
-    part_filter = (CPE_PART_ALLOWED or "").strip().lower()
+def _diretorio_indice() -> str:
+    """Diretório do índice carregado (o da última `construir_indice_cpe`), ou o padrão."""
+    atual = _INDICE
+    return atual[0] if atual is not None else DIRETORIO_NVD
 
-    def _abrir(caminho: str):
-        if caminho.endswith(".gz"):
-            return gzip.open(caminho, "rt", encoding="utf-8")
-        return open(caminho, "r", encoding="utf-8")
+def _limpar_memos() -> None:
+    _bucket_parseado.cache_clear()
+    _casar_cpe.cache_clear()
 
-    for root, _, arquivos in os.walk(diretorio):
-        for arquivo in arquivos:
-            if not (arquivo.endswith(".json") or arquivo.endswith(".json.gz")):
-                continue
+def _limpar_indice() -> None:
+    global _INDICE
+    with _INDICE_LOCK:
+        _INDICE = None
+        _limpar_memos()
 
-            ano = _ano_do_arquivo(arquivo)
-            if ano and ano < limiar:
-                continue
+construir_indice_cpe.cache_clear = _limpar_indice  # compat com a API do lru_cache
 
-            caminho = os.path.join(root, arquivo)
-            try:
-                with _abrir(caminho) as f:
-                    dados = json.load(f)
-            except Exception:
-                continue
+def _montar_indice_cpe(diretorio: str) -> Mapping[Tuple[str, str], List[Tuple]]:
+    """
+    ## _montar_indice_cpe
+    Gera: { (vendor, product): [ (cve, flags, exactVersion, vsi, vse, vei, vee, arquivo) ...] }
 
-            itens = dados.get("CVE_Items") or dados.get("vulnerabilities")
-            if not itens:
-                continue
+    Otimizações:
+    - Cache marshal (nvd_index.marshal) com manifesto {feed: (mtime_ns, tamanho)}:
+      só os feeds novos/alterados são reparseados (em geral só o do ano atual);
+      entradas de feeds alterados/removidos saem pelo campo `arquivo`.
+    - Cache quente não é carregado inteiro: devolve `IndiceCPE` (mmap), que
+      desserializa só os buckets consultados.
+    - Recorte por anos (`NVD_INDEX_MAX_YEARS`).
+    - Filtro por part (default "a").
+    - Um processo por arquivo (`NVD_INDEX_WORKERS`), índices parciais mesclados na ordem.
+    """
+    ano_atual = datetime.now().year
+    limiar = ano_atual - NVD_INDEX_MAX_YEARS
+    part_filter = (CPE_PART_ALLOWED or "").strip().lower()
 
-            for item in itens:
-                # Layouts suportados
-                if "cve" in item:
-                    cve_id = item.get("cve", {}).get("CVE_data_meta", {}).get("ID", "")
-                    nodes = item.get("configurations", {}).get("nodes", [])
+    manifesto = _manifesto_feeds(diretorio, limiar)
+
+    cache = _carregar_indice_cache()
+    if cache and cache.get("part") == part_filter:
+        antigo: Dict[str, Tuple[int, int]] = cache["manifesto"]
+        if antigo == manifesto:
+            return cache["indice"]
+        # vai reescrever o cache: materializa tudo e solta o mmap
+        indice: Dict[Tuple[str, str], List[Tuple]] = dict(cache["indice"].items())
+        cache["indice"].fechar()
+        # feeds alterados ou que saíram do recorte: descarta as entradas deles
+        invalidos = {c for c, carimbo in antigo.items() if manifesto.get(c) != carimbo}
+        if invalidos:
+            for key in list(indice):
+                entries = [e for e in indice[key] if e[E_ARQUIVO] not in invalidos]
+                if entries:
+                    indice[key] = entries
                 else:
-                    vuln = item.get("cve") or item.get("vuln") or {}
-                    cve_id = (vuln.get("id")
-                              or vuln.get("CVE_data_meta", {}).get("ID", "")
-                              or item.get("id", ""))
-                    nodes = item.get("configurations", {}).get("nodes", [])
-
-                for match in _iter_cpe_matches(nodes):
-                    if not match.get("vulnerable", False):
-                        continue
-                    cpe_str = match.get("cpe23Uri") or match.get("criteria") or ""
-                    cpe = parse_cpe23(cpe_str)
-                    if not cpe:
-                        continue
-
-                    if part_filter and cpe.get("part") != part_filter:
-                        continue
-
-                    key = (cpe["vendor"], cpe["product"])
-                    regra = {
-                        "versionStartIncluding": match.get("versionStartIncluding"),
-                        "versionStartExcluding": match.get("versionStartExcluding"),
-                        "versionEndIncluding": match.get("versionEndIncluding"),
-                        "versionEndExcluding": match.get("versionEndExcluding"),
-                    }
-                    any_version = cpe["version"] in ("*", "-", "", None)
-
-                    # Se vier versão exata E sem faixa -> tratar como igualdade
-                    has_range = any(regra.values())
-                    exact_version = None
-                    if not any_version and not has_range:
-                        exact_version = cpe["version"]
-
-                    entry = {
-                        "cve": cve_id,
-                        "anyVersion": any_version,
-                        "versionRules": regra,
-                    }
-                    if exact_version:
-                        entry["exactVersion"] = exact_version
-
-                    indice.setdefault(key, []).append(entry)
-
-    _salvar_indice_cache(indice)
+                    del indice[key]
+        caminhos = [c for c, carimbo in manifesto.items() if antigo.get(c) != carimbo]
+    else:
+        if cache:
+            cache["indice"].fechar()
+        indice = {}
+        caminhos = list(manifesto)
+
+    for parcial in _indices_parciais(caminhos, part_filter):
+        for key, entries in parcial.items():
+            indice.setdefault(key, []).extend(entries)
+
+    _salvar_indice_cache({"part": part_filter, "manifesto": manifesto, "indice": indice})
     return indice
 
 # ==============================
 # Verificação por (vendor, product, version)
 # ==============================
 
-def verificar_vulnerabilidades_por_cpe(vendor: str, product: str, version: Optional[str]) -> Tuple[List[str], List[str]]:
+@lru_cache(maxsize=1024)
+def _bucket_parseado(diretorio: str, vendor: str, product: str) -> Tuple[Tuple, ...]:
     """
-    ## verificar_vulnerabilidades_por_cpe
-    Retorna (confirmadas, suspeitas):
-    - confirmadas: versão dentro da faixa, OU `anyVersion` com versão conhecida,
-      OU `exactVersion` igual.
-    - suspeitas: produto casa mas sem versão do alvo (não há como confirmar).
+    Bucket de (vendor, product) do índice de `diretorio` com as versões do
+    lado NVD já em `Version`:
+    (cve, flags, exactVersion, exata_parseada, vsi, vse, vei, vee).
+    Parse uma vez por produto, não a cada (produto, versão do alvo) consultado.
+    (Version não é serializável em marshal: o parse acontece quando o bucket
+    sai do cache, não na gravação.)
     """
-    indice = construir_indice_cpe()
-    buckets = indice.get((vendor, product), [])
-    confirmadas: List[str] = []
-    suspeitas: List[str] = []
-
-    for entry in buckets:
-        cve = entry["cve"]
+    parseado = []
+    for cve, flags, exact, vsi, vse, vei, vee, _ in construir_indice_cpe(diretorio).get((vendor, product), ()):
+        parseado.append((
+            cve, flags, exact, _to_version(exact),
+            _to_version(vsi), _to_version(vse), _to_version(vei), _to_version(vee),
+        ))
+    return tuple(parseado)
+
+@lru_cache(maxsize=4096)
+def _casar_cpe(
+    diretorio: str, vendor: str, product: str, version: Optional[str]
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Núcleo de `verificar_vulnerabilidades_por_cpe`, memoizado: hosts de uma
+    rede repetem muito o mesmo (produto, versão), e a versão do alvo é
+    parseada uma vez só para todo o bucket. A chave inclui o `diretorio` do
+    índice: bases diferentes não dividem resultados.
+    """
+    va = _to_version(version) if version else None
+    confirmadas: set = set()
+    suspeitas: set = set()
 
-        if entry.get("anyVersion"):
+    for cve, flags, exact, exata, vsi, vse, vei, vee in _bucket_parseado(diretorio, vendor, product):
+        if flags & ANY_VERSION:
             if version:
-                confirmadas.append(cve)
+                confirmadas.add(cve)
             else:
-                suspeitas.append(cve)
+                suspeitas.add(cve)
             continue
 
-        exact = entry.get("exactVersion")
         if exact is not None:
-            if version and versoes_iguais(version, exact):
-                confirmadas.append(cve)
+            if version and _iguais(va, version, exact, exata):
+                confirmadas.add(cve)
             elif not version:
-                suspeitas.append(cve)
+                suspeitas.add(cve)
             continue  # se há exact, não há faixa
 
-        rules = entry.get("versionRules") or {}
-        if version and any(rules.values()) and comparar_versao(version, rules):
-            confirmadas.append(cve)
+        if va is not None and flags & TEM_FAIXA and _na_faixa(va, vsi, vse, vei, vee):
+            confirmadas.add(cve)
         elif not version:
-            suspeitas.append(cve)
+            suspeitas.add(cve)
 
-    return sorted(set(confirmadas)), sorted(set(suspeitas))
+    return tuple(sorted(confirmadas)), tuple(sorted(suspeitas))
+
+def verificar_vulnerabilidades_por_cpe(vendor: str, product: str, version: Optional[str]) -> Tuple[List[str], List[str]]:
+    """
+    ## verificar_vulnerabilidades_por_cpe
+    Retorna (confirmadas, suspeitas):
+    - confirmadas: versão dentro da faixa, OU `anyVersion` com versão conhecida,
+      OU `exactVersion` igual.
+    - suspeitas: produto casa mas sem versão do alvo (não há como confirmar).
+    """
+    confirmadas, suspeitas = _casar_cpe(_diretorio_indice(), vendor, product, version)
+    return list(confirmadas), list(suspeitas)
 
 # ==============================
 # API compatível com o projeto
@@ -378,13 +754,47 @@ def carregar_base_local_cves(diretorio: str = DIRETORIO_NVD, usar_cache: bool =
     if not usar_cache:
         construir_indice_cpe.cache_clear()
         try:
-            if os.path.exists(NVD_INDEX_PKL):
-                os.remove(NVD_INDEX_PKL)
+            if os.path.exists(NVD_INDEX_CACHE):
+                os.remove(NVD_INDEX_CACHE)
         except Exception:
             pass
     _ = construir_indice_cpe(diretorio)
     return {}  # mantido por compat
 
+def _chaves_de_banners(banners: Iterable[str]) -> List[Optional[Tuple[str, str, str]]]:
+    """(vendor, product, versão) de cada banner "porta:texto" (None se não extrair)."""
+    raws = [b.split(":", 1)[-1] if ":" in b else b for b in banners]
+    chaves: List[Optional[Tuple[str, str, str]]] = []
+    for info in _extrair_em_lote(raws):
+        if info:
+            produto, versao = info
+            vendor, product = normalizar_produto(produto)
+            chaves.append((vendor, product, versao))
+        else:
+            chaves.append(None)
+    return chaves
+
+def _resolver_chaves(chaves: Iterable[Optional[Tuple[str, str, str]]]) -> Dict[Tuple[str, str, str], Tuple]:
+    """Uma consulta ao índice por (vendor, product, versão) distinto."""
+    consultas: Dict[Tuple[str, str, str], Tuple] = dict.fromkeys(c for c in chaves if c)
+    diretorio = _diretorio_indice()
+    for chave in consultas:
+        consultas[chave] = _casar_cpe(diretorio, *chave)
+    return consultas
+
+def _agregar(chaves, consultas, detalhado: bool):
+    confirmadas_agg: set = set()
+    suspeitas_agg: set = set()
+    for chave in chaves:
+        if chave:
+            c, s = consultas[chave]
+            confirmadas_agg.update(c)
+            suspeitas_agg.update(s)
+
+    if detalhado:
+        return sorted(confirmadas_agg), sorted(suspeitas_agg)
+    return sorted(confirmadas_agg | suspeitas_agg)
+
 def verificar_vulnerabilidades_em_banners(
     banners: Iterable[str],
     base_cves=None,            # ignorado (compat)
@@ -395,29 +805,36 @@ def verificar_vulnerabilidades_em_banners(
     Recebe banners (ex.: "80:Server: Apache/2.4.49 ...").
     - Extrai (produto, versão).
     - Normaliza para (vendor, product).
-    - Consulta índice CPE (any/exact/faixa).
+    - Consulta índice CPE (any/exact/faixa), uma vez por (vendor, product, versão) distinto.
 
     Retorna:
       - detalhado=False: lista única (confirmadas + suspeitas, sem duplicatas)
       - detalhado=True: (confirmadas, suspeitas)
     """
-    confirmadas_agg: List[str] = []
-    suspeitas_agg: List[str] = []
-
-    for b in banners:
-        raw = b.split(":", 1)[-1] if ":" in b else b
-        info = extrair_nome_versao_banner(raw)
-        if not info:
-            continue
-        produto, versao = info
-        vendor, product = normalizar_produto(produto)
-        c, s = verificar_vulnerabilidades_por_cpe(vendor, product, versao)
-        confirmadas_agg.extend(c)
-        suspeitas_agg.extend(s)
+    chaves = _chaves_de_banners(banners)
+    return _agregar(chaves, _resolver_chaves(chaves), detalhado)
 
-    confirmadas_uniq = sorted(set(confirmadas_agg))
-    suspeitas_uniq = sorted(set(suspeitas_agg))
-
-    if detalhado:
-        return confirmadas_uniq, suspeitas_uniq
-    return sorted(set(confirmadas_uniq + suspeitas_uniq))
+def verificar_vulnerabilidades_em_lote(banners_por_host: Dict[str, List[str]], detalhado: bool = True) -> Dict[str, object]:
+    """
+    ## verificar_vulnerabilidades_em_lote
+    `verificar_vulnerabilidades_em_banners` para vários hosts de uma vez:
+    extrai os banners de todos numa passada, consulta cada
+    (vendor, product, versão) distinto UMA vez (numa /24 os mesmos serviços
+    se repetem host a host) e distribui o resultado. {host: mesmo retorno}.
+    """
+    hosts = list(banners_por_host)
+    todos: List[str] = []
+    limites: List[int] = []
+    for host in hosts:
+        todos.extend(banners_por_host[host])
+        limites.append(len(todos))
+
+    chaves = _chaves_de_banners(todos)
+    consultas = _resolver_chaves(chaves)
+
+    resultado: Dict[str, object] = {}
+    ini = 0
+    for host, fim in zip(hosts, limites):
+        resultado[host] = _agregar(chaves[ini:fim], consultas, detalhado)
+        ini = fim
+    return resultado
@@ -0,0 +1,230 @@
+"""
+# governance.py
+
+## Descrição
+Governança adaptativa do scan (consumida por __main__.py):
+- `LatencyTracker`: janela móvel das durações de `verificar_host` ONLINE (P99).
+- `AdaptiveGovernor`: AIMD sobre batch/hosts/portas guiado por goodput,
+  timeouts e cauda de latência.
+
+## Autor
+Luiz
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+from collections import deque
+from typing import Optional, Tuple
+
+
+# ==============================
+# Latência por host (janela móvel)
+# ==============================
+
+class LatencyTracker:
+    """
+    Janela móvel das durações (s) de `verificar_host` de hosts ONLINE
+    (os offline, ~1 s de ping, puxariam o P99 e o prazo para baixo).
+    - P99 só é reportado após `min_amostras` (cold start => None).
+    """
+
+    def __init__(self, tamanho: int = 512, min_amostras: int = 32):
+        self._amostras = deque(maxlen=tamanho)
+        self.min_amostras = min_amostras
+
+    def registrar(self, duracao: float) -> None:
+        self._amostras.append(duracao)
+
+    def p99(self) -> Optional[float]:
+        if len(self._amostras) < self.min_amostras:
+            return None
+        return statistics.quantiles(self._amostras, n=100)[98]
+
+
+# ==============================
+# Governança adaptativa (AIMD)
+# ==============================
+
+class AdaptiveGovernor:
+    """
+    Governança AIMD (additive-increase, multiplicative-decrease), como no
+    controle de congestionamento do TCP:
+    - Sinal único de sobrecarga: goodput por slot (conclusões/s/host em voo,
+      i.e. 1/latência pela Lei de Little) abaixo de 70% do melhor recente
+      OU timeouts acima do moderado. Sem limiares em segundos: o "lote lento"
+      é derivado do goodput (batch / (melhor * hosts * 0.7)).
+    - Sobrecarga => batch/hosts/portas *= beta (cooldown de 1 lote).
+    - Lote bom  => cada parâmetro += alpha/valor (Reno), acumulado em float.
+    - Timeout aumenta apenas se houver timeouts reais e a cauda (P99) for lenta;
+      em lote bom volta -0.5 s por vez até o valor inicial (não fica inflado
+      pelo resto do scan por causa de um trecho ruim).
+    - Prazo por host = 2 x P99 medido (fórmula fixa no cold start), com piso
+      no tempo esperado do portscan.
+    """
+
+    def __init__(
+        self,
+        batch_ini: int,
+        hosts_ini: int,
+        portas_ini: int,
+        timeout_ini: float,
+        # limites
+        batch_min: int = 6,
+        batch_max: int = 16,
+        hosts_min: int = 4,
+        hosts_max: int = 12,
+        portas_min: int = 2,
+        portas_max: int = 6,
+        timeout_min: float = 1.5,
+        timeout_max: float = 5.0,
+        # critérios
+        fator_goodput_lento: float = 0.7,    # goodput < 70% do melhor = sobrecarga
+        janela_goodput: int = 8,             # "melhor recente" = máx. dos últimos N lotes
+        timeout_ratio_moderado: float = 0.10,# >10% já preocupa
+        # AIMD
+        beta: float = 0.7,                   # corte multiplicativo
+        alpha_batch: float = 1.0,            # subida aditiva (mais lenta p/ hosts/portas)
+        alpha_hosts: float = 0.5,
+        alpha_portas: float = 0.25,
+        cool_down_lotes: int = 1,
+    ):
+        self.batch = batch_ini
+        self.hosts = hosts_ini
+        self.portas = portas_ini
+        self.timeout = timeout_ini
+        self._timeout_base = max(timeout_min, min(timeout_max, float(timeout_ini)))
+
+        # constantes do config empacotadas uma vez: suggest()/_clamp() desempacotam
+        # em locais (sem ~30 LOAD_ATTR por chamada), barato o bastante p/ rodar
+        # a cada conclusão se um dia for preciso. Fonte única: os nomes públicos
+        # (batch_min, beta, ...) são propriedades somente leitura sobre as tuplas
+        self._limites = (
+            float(batch_min), float(batch_max), float(hosts_min), float(hosts_max),
+            float(portas_min), float(portas_max), timeout_min, timeout_max,
+        )
+        self._criterios = (
+            fator_goodput_lento, timeout_ratio_moderado, beta,
+            alpha_batch, alpha_hosts, alpha_portas, cool_down_lotes,
+        )
+
+        self._cooldown = 0
+        # valores contínuos do AIMD (lidos com floor)
+        self._batch_f = float(batch_ini)
+        self._hosts_f = float(hosts_ini)
+        self._portas_f = float(portas_ini)
+
+        self.latencias = LatencyTracker()
+        self._goodputs = deque(maxlen=janela_goodput)
+        self._goodput_ewma: Optional[float] = None
+
+    # Limites e critérios (somente leitura, lidos de `_limites`/`_criterios`)
+    batch_min = property(lambda self: int(self._limites[0]))
+    batch_max = property(lambda self: int(self._limites[1]))
+    hosts_min = property(lambda self: int(self._limites[2]))
+    hosts_max = property(lambda self: int(self._limites[3]))
+    portas_min = property(lambda self: int(self._limites[4]))
+    portas_max = property(lambda self: int(self._limites[5]))
+    timeout_min = property(lambda self: self._limites[6])
+    timeout_max = property(lambda self: self._limites[7])
+    fator_goodput_lento = property(lambda self: self._criterios[0])
+    timeout_ratio_moderado = property(lambda self: self._criterios[1])
+    beta = property(lambda self: self._criterios[2])
+    alpha_batch = property(lambda self: self._criterios[3])
+    alpha_hosts = property(lambda self: self._criterios[4])
+    alpha_portas = property(lambda self: self._criterios[5])
+    cool_down_lotes = property(lambda self: self._criterios[6])
+
+    @property
+    def melhor_goodput(self) -> float:
+        """Melhor goodput por slot (hosts/s/host em voo) entre os lotes recentes."""
+        return max(self._goodputs, default=0.0)
+
+    @property
+    def lote_lento_seg(self) -> float:
+        """Duração a partir da qual um lote de `batch` hosts é considerado lento."""
+        melhor = self.melhor_goodput
+        if melhor <= 0:
+            return float("inf")
+        return self.batch / (melhor * self.hosts * self.fator_goodput_lento)
+
+    def prazo_host(self, n_portas: int = 0) -> float:
+        """
+        Prazo de espera por host: clamp(2 x P99, timeout_min, fórmula fixa),
+        nunca abaixo do portscan esperado (`n_portas` em rodadas de `portas`
+        conexões, cada uma até `timeout`): host lento mas vivo não vira OFFLINE.
+        """
+        piso = self.timeout * math.ceil(n_portas / max(1, self.portas)) if n_portas else 0.0
+        teto = (self.timeout * 2) + 5
+        p99 = self.latencias.p99()
+        if p99 is None:
+            return max(piso, teto)
+        return max(piso, self.timeout_min, min(teto, 2.0 * p99))
+
+    def _clamp(self):
+        b_min, b_max, h_min, h_max, p_min, p_max, t_min, t_max = self._limites
+        self._batch_f = max(b_min, min(b_max, self._batch_f))
+        self._hosts_f = max(h_min, min(h_max, self._hosts_f))
+        self._portas_f = max(p_min, min(p_max, self._portas_f))
+        self.batch = int(self._batch_f)
+        self.hosts = int(self._hosts_f)
+        self.portas = int(self._portas_f)
+        self.timeout = max(t_min, min(t_max, float(self.timeout)))
+
+    def suggest(self, duracao_lote: float, timeouts: int, concluidos: int) -> Tuple[bool, str]:
+        """Decide se ajusta e como. Retorna (ajustou, mensagem)."""
+        if concluidos <= 0:
+            return False, ""
+        fator_lento, ratio_moderado, beta, a_batch, a_hosts, a_portas, cool_down = self._criterios
+
+        p99 = self.latencias.p99()
+        ratio_timeout = timeouts / max(1, concluidos)
+        goodput = concluidos / max(duracao_lote, 1e-3)
+        # por slot: cortar hosts não derruba o sinal (evita espiral de cortes)
+        goodput_slot = goodput / max(1, self.hosts)
+        # suavizado (EWMA): um lote azarado (só hosts offline) não dispara corte
+        if self._goodput_ewma is None:
+            self._goodput_ewma = goodput_slot
+        else:
+            self._goodput_ewma = 0.7 * self._goodput_ewma + 0.3 * goodput_slot
+        goodput_lento = self._goodput_ewma < self.melhor_goodput * fator_lento
+        self._goodputs.append(self._goodput_ewma)
+        sobrecarga = goodput_lento or (ratio_timeout > ratio_moderado)
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False, ""
+
+        antes = (self.batch, self.hosts, self.portas, self.timeout)
+
+        if sobrecarga:
+            # ======= REDUÇÃO (multiplicativa) =======
+            self._batch_f *= beta
+            self._hosts_f *= beta
+            self._portas_f *= beta
+            # Timeout sobe só com timeouts reais E cauda medida lenta
+            # (P99 rápido => os timeouts são hosts travados; timeout maior não ajuda)
+            cauda_lenta = p99 is None or p99 >= self.timeout
+            if ratio_timeout >= ratio_moderado and cauda_lenta:
+                self.timeout += 0.5
+            self._cooldown = cool_down
+            motivo = f"sobrecarga: {goodput:.1f} hosts/s, timeouts {ratio_timeout:.0%}"
+        else:
+            # ======= AUMENTO (aditivo, Reno) =======
+            self._batch_f += a_batch / self._batch_f
+            self._hosts_f += a_hosts / self._hosts_f
+            self._portas_f += a_portas / self._portas_f
+            # Desfaz aumentos de timeout, mas não abaixo da cauda medida
+            if self.timeout > self._timeout_base and (p99 is None or p99 < self.timeout):
+                self.timeout = max(self._timeout_base, self.timeout - 0.5)
+            motivo = f"estável: {goodput:.1f} hosts/s"
+
+        self._clamp()
+        depois = (self.batch, self.hosts, self.portas, self.timeout)
+        if depois == antes:
+            return False, ""
+        return True, (
+            f"batch->{self.batch}, hosts->{self.hosts}, portas->{self.portas}, "
+            f"timeout->{self.timeout:.1f}s ({motivo})"
+        )
@@ -0,0 +1,42 @@
+"""
+# nvd_state.py
+
+## Descrição
+Controle de quando a base NVD precisa ser atualizada (consumido por __main__.py):
+- Registro da última atualização em `nvd_data/ultima_atualizacao.txt`.
+- Verificação se o intervalo mínimo entre atualizações já passou, pelo
+  `mtime` do arquivo (um `stat`, sem leitura/parse de data nem fuso/DST).
+
+## Autor
+Luiz
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+# Caminhos NVD
+CAMINHO_NVD = "nvd_data"
+CAMINHO_REGISTRO_ATUALIZACAO = os.path.join(CAMINHO_NVD, "ultima_atualizacao.txt")
+INTERVALO_DIAS_ATUALIZACAO = 7  # dias
+
+
+# ==============================
+# Utilidades NVD
+# ==============================
+
+def precisa_atualizar_nvd() -> bool:
+    """True se o registro não existe ou foi modificado há mais que o intervalo (via mtime)."""
+    try:
+        mtime = os.stat(CAMINHO_REGISTRO_ATUALIZACAO).st_mtime
+    except OSError:
+        return True
+    return mtime < time.time() - INTERVALO_DIAS_ATUALIZACAO * 86400
+
+
+def registrar_data_atualizacao() -> None:
+    """Registra a atualização: só o mtime do arquivo importa (`touch`, sem conteúdo)."""
+    os.makedirs(CAMINHO_NVD, exist_ok=True)
+    Path(CAMINHO_REGISTRO_ATUALIZACAO).touch()
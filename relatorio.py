@@ -9,10 +9,11 @@ da auditoria de rede realizada pelo sistema.
 - Exibe os dados dos hosts em uma tabela colorida no terminal usando `rich`.
 - Aplica cores específicas para status, MAC, SO, portas críticas, banners e latência.
 - Exporta os dados para um arquivo `.csv` com separador `;`.
+- Serializa cada host como uma linha JSONL (gravação incremental durante o scan).
 
 ### Integração:
-Este módulo depende do dicionário de status (`status_dict`) construído pelo scanner.
-Utiliza também a constante `PORTAS_CRITICAS` do módulo `scan`.
+Este módulo depende do dicionário de status (`status_dict`, IP -> `scan.HostResult`) construído pelo scanner.
+Utiliza também a constante `PORTAS_CRITICAS_STR` do módulo `scan`.
 
 ## Autor
 Luiz
@@ -22,14 +23,21 @@ Luiz
 - rich.table
 - rich.box
 - csv
+- orjson (opcional; fallback para json)
 """
 
 from rich.console import Console
 from rich.table import Table
 from rich import box
 import csv
+import json
 
-from scan import PORTAS_CRITICAS
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+from scan import PORTAS_CRITICAS_STR
 
 console = Console()
 
@@ -39,7 +47,7 @@ def gerar_tabela(status_dict):
     Gera uma tabela visual no terminal com os dados da auditoria de rede.
 
     Parâmetros:
-        status_dict (dict): Dicionário contendo os dados coletados por IP.
+        status_dict (dict): Dicionário IP -> `HostResult` com os dados coletados.
 
     Retorna:
         Table (rich.table.Table): Tabela formatada para visualização no terminal.
@@ -62,46 +70,46 @@ def gerar_tabela(status_dict):
         s = status_dict[ip]
 
         # === Formatação de colunas ===
-        status_color = "[green]ONLINE[/green]" if s["status"] == "ONLINE" else "[red]OFFLINE[/red]"
+        status_color = "[green]ONLINE[/green]" if s.status == "ONLINE" else "[red]OFFLINE[/red]"
 
         nome_fmt = (
-            f"[grey30]{s['nome']}[/grey30]"
-            if s["nome"] in ["Nome N/D", "-"]
-            else s["nome"]
+            f"[grey30]{s.nome}[/grey30]"
+            if s.nome in ["Nome N/D", "-"]
+            else s.nome
         )
 
         mac_fmt = (
-            f"[red]{s['mac']}[/red]"
-            if s["mac"] == "MAC N/D"
-            else f"[grey30]{s['mac']}[/grey30]"
-            if s["mac"] == "-"
-            else f"[bold cyan]{s['mac']}[/bold cyan]"
+            f"[red]{s.mac}[/red]"
+            if s.mac == "MAC N/D"
+            else f"[grey30]{s.mac}[/grey30]"
+            if s.mac == "-"
+            else f"[bold cyan]{s.mac}[/bold cyan]"
         )
 
         fab_fmt = (
-            f"[grey30]{s['fabricante']}[/grey30]"
-            if s["fabricante"] in ["Fabricante N/D", "-"]
-            else s["fabricante"]
+            f"[grey30]{s.fabricante}[/grey30]"
+            if s.fabricante in ["Fabricante N/D", "-"]
+            else s.fabricante
         )
 
         ip_fmt = (
             f"[yellow]{ip}[/yellow]"
-            if s["status"] == "ONLINE"
+            if s.status == "ONLINE"
             else f"[grey30]{ip}[/grey30]"
         )
 
         # Porta crítica em vermelho, outras em azul
         portas_fmt = (
             ", ".join(
-                f"[red]{p}[/red]" if int(p) in PORTAS_CRITICAS else f"[blue]{p}[/blue]"
-                for p in s["portas"]
+                f"[red]{p}[/red]" if p in PORTAS_CRITICAS_STR else f"[blue]{p}[/blue]"
+                for p in s.portas
             )
-            if s["portas"]
+            if s.portas
             else "-"
         )
 
         # Cores por faixa de latência
-        lat = s["latencia"]
+        lat = s.latencia
         if lat == -1:
             latencia_fmt = "[grey58]-[/grey58]"
         elif lat <= 10:
@@ -113,13 +121,13 @@ def gerar_tabela(status_dict):
         else:
             latencia_fmt = f"[red]{lat:.1f} ms[/red]"
 
-        banners_fmt = ", ".join(s["banners"]) if s["banners"] else "-"
-        vulns_fmt = ", ".join(s.get("vulnerabilidades", [])) if s.get("vulnerabilidades") else "-"
+        banners_fmt = ", ".join(s.banners) if s.banners else "-"
+        vulns_fmt = ", ".join(s.vulnerabilidades) if s.vulnerabilidades else "-"
 
         # Adiciona linha na tabela
         tabela.add_row(
             ip_fmt, status_color, nome_fmt, mac_fmt, latencia_fmt,
-            fab_fmt, s["so"], portas_fmt, banners_fmt, vulns_fmt
+            fab_fmt, s.so, portas_fmt, banners_fmt, vulns_fmt
         )
 
     return tabela
@@ -130,25 +138,36 @@ def exportar_csv(status_dict, caminho="auditoria_hosts.csv"):
     Exporta os dados da auditoria para um arquivo CSV.
 
     Parâmetros:
-        status_dict (dict): Dicionário contendo os dados por IP.
+        status_dict (dict): Dicionário IP -> `HostResult`.
         caminho (str): Caminho do arquivo de saída (padrão: auditoria_hosts.csv).
     """
     try:
-        with open(caminho, "w", newline='', encoding='utf-8') as f:
+        with open(caminho, "w", newline='', encoding='utf-8', buffering=1 << 20) as f:
             writer = csv.writer(f, delimiter=';')
             writer.writerow([
                 "IP", "Status", "Hostname", "MAC", "Fabricante",
                 "SO", "Portas", "Banners", "Vulnerabilidades", "Latência (ms)"
             ])
-
-            for ip, s in status_dict.items():
-                portas_texto = ", ".join(s["portas"])
-                banners_texto = ", ".join(s["banners"])
-                vulns_texto = ", ".join(s.get("vulnerabilidades", []))
-
-                writer.writerow([
-                    ip, s["status"], s["nome"], s["mac"], s["fabricante"],
-                    s["so"], portas_texto, banners_texto, vulns_texto, s["latencia"]
-                ])
+            # Todas as linhas numa chamada (laço em C) e buffer de 1 MiB: poucas escritas em disco
+            writer.writerows(
+                (
+                    ip, s.status, s.nome, s.mac, s.fabricante, s.so,
+                    ", ".join(s.portas), ", ".join(s.banners), ", ".join(s.vulnerabilidades),
+                    s.latencia,
+                )
+                for ip, s in status_dict.items()
+            )
     except Exception as e:
         console.print(f"[red]Erro ao exportar CSV:[/red] {e}")
+
+
+def linha_jsonl(host) -> str:
+    """
+    Serializa um `HostResult` como uma linha JSONL (com '\\n').
+
+    Usado pelo __main__ para gravar cada host assim que ele conclui: se o scan
+    cair ou for interrompido, o que já foi varrido está em disco.
+    """
+    if orjson is not None:
+        return orjson.dumps(host).decode() + "\n"
+    return json.dumps({k: getattr(host, k) for k in host.__slots__}, ensure_ascii=False) + "\n"
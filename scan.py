@@ -3,13 +3,14 @@
 
 ## Descrição
 Scanner de hosts e portas com:
-- Ping + TTL + latência
-- Hostname (opcional por ENV)
+- Ping + TTL + latência (ICMP por socket; `ping` do SO só como fallback)
+- Hostname por DNS reverso em lote, fora do caminho crítico (`resolver_hostnames`)
 - MAC por ARP e fabricante (via dicionário `fabricantes`)
 - Detecção de SO via TTL
-- Portscan com banner grabbing usando **probes por protocolo**
+- Portscan assíncrono (um event loop compartilhado por todos os hosts) com banner grabbing usando **probes por protocolo**
 - Limite global de sockets (semáforo) para não travar a máquina
-- Montagem do dicionário final do host (compatível com __main__.py/relatorio.py)
+- RTT global da rede limitando o timeout de connect em portas filtradas
+- Montagem do resultado final do host (`HostResult`, usado por __main__.py/relatorio.py)
 
 Cada função faz UMA coisa. Comentários em Markdown/Doxygen.
 
@@ -22,34 +23,137 @@ from __future__ import annotations
 import os
 import re
 import ssl
+import errno
+import asyncio
+import sys
+import time
 import socket
+import struct
+import itertools
 import platform
 import subprocess
 from typing import Dict, List, Tuple, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
 import threading
 
+try:
+    from cve import verificar_vulnerabilidades_em_banners
+except ImportError:  # opcional: sem cve.py/packaging o scan segue, só sem CVEs
+    verificar_vulnerabilidades_em_banners = None
+
 # ============================
 # Configs por ENV
 # ============================
 
 MAX_SOCKETS = int(os.getenv("VH_MAX_SOCKETS", "256"))   # limite global de sockets simultâneos
-RESOLVE_HOSTNAME = os.getenv("VH_RESOLVE_HOSTNAME", "1") == "1"
+
+# TCP Fast Open (Linux): a probe HTTP vai no próprio SYN quando o servidor já deu cookie
+TCP_FASTOPEN = os.getenv("VH_TCP_FASTOPEN", "1") == "1" and hasattr(socket, "MSG_FASTOPEN")
+PING_SOCKET = os.getenv("VH_PING_SOCKET", "1") == "1"   # ICMP direto por socket (0 = sempre o `ping` do SO)
+PING_TIMEOUT = float(os.getenv("VH_PING_TIMEOUT", "1.0"))  # espera pelo echo reply (s), como `ping -W 1`
+# portscan especulativo: começa quando o ping responde OU após X s sem resposta (< 0 = só depois do ping)
+ESPECULACAO_PORTAS = float(os.getenv("VH_ESPECULACAO_PORTAS", "0.1"))
+# descoberta TCP junto com o ping: host que bloqueia ICMP mas responde (SYN-ACK/RST) numa destas portas
+DESCOBERTA_TCP = os.getenv("VH_DESCOBERTA_TCP", "1") == "1"
+PORTAS_DESCOBERTA = (80, 443, 445, 22, 3389)
+# corte do portscan por host (0 = desligado, varre tudo): após N portas abertas / após X s
+PARAR_APOS_ABERTAS = int(os.getenv("VH_PARAR_APOS_ABERTAS", "0"))
+PRAZO_PORTAS = float(os.getenv("VH_PRAZO_PORTAS", "0"))
 
 SOCKET_SEM = threading.Semaphore(MAX_SOCKETS)
 
+_IS_WIN = platform.system().lower().startswith("win")  # uma vez no import, não por host
+
+
+# ============================
+# Resultado por host
+# ============================
+
+@dataclass(slots=True)
+class HostResult:
+    """
+    Resultado de um host. Com `__slots__` (sem `__dict__` por instância): um
+    objeto por IP do range, então o custo por host importa em /16.
+    """
+
+    ip: str
+    status: str = "OFFLINE"
+    nome: str = "N/D"
+    mac: str = "N/D"
+    fabricante: str = "N/D"
+    so: str = "N/D"
+    portas: List[str] = field(default_factory=list)
+    banners: List[str] = field(default_factory=list)
+    vulnerabilidades: List[str] = field(default_factory=list)
+    latencia: float = -1.0
+    erro: Optional[str] = None
+
+    @classmethod
+    def offline(cls, ip: str, erro: Optional[str] = None) -> "HostResult":
+        """Resultado OFFLINE (sem resposta, falha ou prazo estourado)."""
+        return cls(ip, erro=erro)
+
+
+# ============================
+# RTT global ("scan buddies")
+# ============================
+
+class GlobalRTT:
+    """
+    Estimador de RTT da rede (SRTT/RTTVAR do TCP, RFC 6298), alimentado por
+    qualquer conexão que responda (SYN-ACK ou RST), de qualquer host.
+    Serve para limitar o timeout de connect de portas/hosts filtrados: se a
+    rede responde em ms, não faz sentido esperar `timeout_socket` inteiro.
+    """
+
+    PISO_SEG = 0.25  # nunca abaixo disso (conservador)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._srtt: Optional[float] = None
+        self._rttvar = 0.0
+
+    def observar(self, rtt: float) -> None:
+        with self._lock:
+            if self._srtt is None:
+                self._srtt = rtt
+                self._rttvar = rtt / 2
+            else:
+                self._rttvar = 0.75 * self._rttvar + 0.25 * abs(self._srtt - rtt)
+                self._srtt = 0.875 * self._srtt + 0.125 * rtt
+
+    def timeout_conexao(self, timeout: float) -> float:
+        """min(timeout, max(4*srtt, srtt+4*rttvar, piso)); sem amostras => timeout."""
+        srtt = self._srtt
+        if srtt is None:
+            return timeout
+        return min(timeout, max(4 * srtt, srtt + 4 * self._rttvar, self.PISO_SEG))
+
+
+RTT_GLOBAL = GlobalRTT()
+
 
 @contextmanager
 def open_conn(ip: str, porta: int, timeout: float):
     """
     Context manager para abrir conexão respeitando o limite global de sockets.
     Garante liberação do semáforo e fechamento do socket.
+    Conexões que respondem (aceitas ou recusadas) alimentam `RTT_GLOBAL`.
     """
     SOCKET_SEM.acquire()
     s = None
     try:
-        s = socket.create_connection((ip, porta), timeout=timeout)
+        t0 = time.monotonic()
+        try:
+            s = socket.create_connection((ip, porta), timeout=timeout)
+        except ConnectionRefusedError:
+            RTT_GLOBAL.observar(time.monotonic() - t0)  # RST também é uma resposta
+            raise
+        RTT_GLOBAL.observar(time.monotonic() - t0)
         yield s
     finally:
         try:
@@ -75,22 +179,30 @@ PORTAS_CRITICAS = [
     135, 137, 138, 139, 445,
 ]
 
-# Portas comuns (varredura padrão)
-PORTAS_COMUNS = sorted(set([
+# Mesmo conjunto como texto: `HostResult.portas` guarda str, e o relatório
+# testa cada porta de cada host sem `int()`.
+PORTAS_CRITICAS_STR = frozenset(str(p) for p in PORTAS_CRITICAS)
+
+# Portas comuns (varredura padrão), na ordem de disparo: as que mais acham
+# serviço primeiro (web, SSH, SMB, RDP), para que `VH_PARAR_APOS_ABERTAS` /
+# `VH_PRAZO_PORTAS` cortem a cauda menos provável. O relatório ordena por número.
+PORTAS_COMUNS = list(dict.fromkeys([
+    # Mais frequentes
+    80, 443, 22, 445, 3389, 139, 135, 8080,
     # Administração
-    22, 23, 3389, 5900, 5985, 5986, 10000,
+    23, 5900, 5985, 5986, 10000,
     # Web
-    80, 443, 8080, 8443, 8888, 8000,
-    # Bancos de dados
-    1433, 1521, 3306, 5432,
+    8443, 8888, 8000,
     # Compartilhamento de arquivos e RPC
-    135, 137, 138, 139, 445,
+    137, 138,
     # Email
     25, 465, 587, 110, 995, 143, 993,
+    # Bancos de dados
+    1433, 1521, 3306, 5432,
+    # Impressão e dispositivos
+    9100, 631, 515,
     # Infraestrutura e diversos
     3000, 3001, 4000, 4001, 6379, 11211, 27017,
-    # Impressão e dispositivos
-    515, 631, 9100,
 ]))
 
 
@@ -98,6 +210,26 @@ PORTAS_COMUNS = sorted(set([
 # Probes por protocolo
 # ============================
 
+# TLS direto (HTTPS, SMTPS, IMAPS, POP3S, FTPS): porta -> probe depois do
+# handshake (b"" = servidor fala primeiro; "%s" vira o IP, p/ o Host do HTTP)
+PORTAS_TLS = {
+    443: b"HEAD / HTTP/1.0\r\nHost: %s\r\n\r\n",
+    465: b"",
+    993: b"",
+    995: b"",
+    990: b"",
+}
+
+# Servidor fala primeiro (FTP, SSH, Telnet, SMTP, POP3, IMAP, MySQL, VNC): a
+# saudação já é o banner; mandar probe só gasta um RTT e pode estragá-la.
+PORTAS_SERVIDOR_FALA_PRIMEIRO = frozenset((21, 22, 23, 25, 110, 143, 587, 3306, 5900))
+
+# Portas sem probe conhecida: ouve por ESPERA_SAUDACAO; se nada vier, manda PROBE_GENERICA
+ESPERA_SAUDACAO = 0.3
+PROBE_GENERICA = b"\r\n\r\n"
+
+# Probes das portas em que o cliente fala primeiro (as de PORTAS_SERVIDOR_FALA_PRIMEIRO
+# ficam aqui só por compat; o portscan não as envia)
 SERVICE_PROBES: Dict[int, bytes] = {
     # HTTP (HEAD simples)
     80:   b"HEAD / HTTP/1.0\r\nHost: localhost\r\n\r\n",
@@ -129,12 +261,50 @@ SERVICE_PROBES: Dict[int, bytes] = {
 # Helpers (uma função = uma coisa)
 # ============================
 
-def _clean_banner(s: str) -> str:
-    """Normaliza banner para uma linha curta."""
+# Padrões compilados no import (cabeçalho HTTP, tabela ARP do Windows, MAC).
+# Campos de formato fixo (ttl=, time=, lladdr) saem por str.find (`_numero_apos`, `_primeiro_mac`).
+_RE_HTTP_SERVER = re.compile(r"\bserver:\s*([^\r\n]+)", re.IGNORECASE)
+_RE_ARP_WIN = re.compile(r"^\s*([0-9.]+)\s+([0-9a-fA-F\-\:]+)", re.MULTILINE)  # linha "ip  mac  tipo"
+_HEX = frozenset("0123456789abcdefABCDEF")
+
+
+def _criar_contexto_tls() -> ssl.SSLContext:
+    """
+    Contexto TLS único do banner grabbing: sem verificação (só queremos o
+    banner; equipamento de rede quase sempre tem certificado autoassinado),
+    logo sem carregar o repositório de CAs, e com cifras legadas liberadas
+    para ainda conversar com firmware antigo.
+    """
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    ctx.options |= ssl.OP_NO_COMPRESSION
+    try:
+        ctx.set_ciphers("ALL:@SECLEVEL=0")
+    except ssl.SSLError:
+        pass  # OpenSSL sem SECLEVEL: fica o padrão
+    return ctx
+
+
+_SSL_CTX = _criar_contexto_tls()
+
+# CR/LF -> espaço e ';' -> ',' (o CSV usa ';'), numa passada só (translate, em C)
+_LIMPEZA_BYTES = bytes.maketrans(b"\r\n;", b"  ,")
+_LIMPEZA_STR = str.maketrans("\r\n;", "  ,")
+
+
+def _clean_banner(s) -> str:
+    """
+    Normaliza banner para uma linha curta. Aceita os bytes lidos do socket
+    direto: limpa antes de decodificar (\r, \n e ';' são ASCII, nunca parte
+    de um caractere UTF-8), sem str intermediária.
+    """
     if not s:
         return "-"
-    s = s.replace("\r", " ").replace("\n", " ").strip()
-    s = s.replace(";", ",")
+    if isinstance(s, (bytes, bytearray)):
+        s = s.translate(_LIMPEZA_BYTES).strip().decode(errors="ignore")
+    else:
+        s = s.translate(_LIMPEZA_STR).strip()
     return s if s else "-"
 
 
@@ -146,43 +316,61 @@ def _recv_small(sock: socket.socket, chunk_size: int = 2048) -> bytes:
         return b""
 
 
-def _banner_https(ip: str, timeout: float) -> str:
-    """Handshake TLS + tentativa de HEAD em :443."""
+def _probe_tls(ip: str, porta: int) -> bytes:
+    """Probe pós-handshake da porta TLS (ver `PORTAS_TLS`)."""
+    probe = PORTAS_TLS[porta]
+    return probe % ip.encode() if b"%s" in probe else probe
+
+
+def _banner_tls(ip: str, porta: int, timeout: float) -> str:
+    """Handshake TLS (contexto único `_SSL_CTX`) + probe da tabela `PORTAS_TLS`."""
     try:
-        with open_conn(ip, 443, timeout) as raw:
-            ctx = ssl.create_default_context()
-            with ctx.wrap_socket(raw, server_hostname=ip) as tls:
+        with open_conn(ip, porta, timeout) as raw:
+            with _SSL_CTX.wrap_socket(raw, server_hostname=ip) as tls:
                 tls.settimeout(timeout)
-                try:
-                    req = b"HEAD / HTTP/1.0\r\nHost: " + ip.encode() + b"\r\n\r\n"
-                    tls.sendall(req)
-                    data = _recv_small(tls)
-                    return _clean_banner(data.decode(errors="ignore"))
-                except Exception:
-                    data = _recv_small(tls)
-                    return _clean_banner(data.decode(errors="ignore"))
+                probe = _probe_tls(ip, porta)
+                if probe:
+                    try:
+                        tls.sendall(probe)
+                    except Exception:
+                        pass
+                data = _recv_small(tls)
+                return _clean_banner(data)
     except Exception:
         return "-"
 
 
+def _probe_da_porta(porta: int) -> Optional[bytes]:
+    """
+    b""   => só ouvir (servidor fala primeiro);
+    bytes => enviar já (cliente fala primeiro, ex.: HTTP);
+    None  => desconhecida: ouvir `ESPERA_SAUDACAO`, depois `PROBE_GENERICA`.
+    """
+    if porta in PORTAS_SERVIDOR_FALA_PRIMEIRO:
+        return b""
+    return SERVICE_PROBES.get(porta)
+
+
 def banner_grabbing(ip: str, porta: int, timeout: float = 2.5) -> str:
-    """Obtém banner usando probes específicas por porta (com limite global de sockets)."""
-    if porta in (443, 465, 993, 995, 990):
-        if porta == 443:
-            return _banner_https(ip, timeout)
-        try:
-            with open_conn(ip, porta, timeout) as raw:
-                ctx = ssl.create_default_context()
-                with ctx.wrap_socket(raw, server_hostname=ip) as tls:
-                    tls.settimeout(timeout)
-                    data = _recv_small(tls)
-                    return _clean_banner(data.decode(errors="ignore"))
-        except Exception:
-            return "-"
+    """
+    Obtém banner usando probes específicas por porta (com limite global de sockets).
+    Versão bloqueante, em conexão própria; o portscan lê o banner na conexão
+    do próprio teste (`_ler_banner`).
+    """
+    if porta in PORTAS_TLS:
+        return _banner_tls(ip, porta, timeout)
 
-    probe = SERVICE_PROBES.get(porta)
+    probe = _probe_da_porta(porta)
     try:
         with open_conn(ip, porta, timeout) as s:
+            if probe is None:
+                # ouve antes de falar: saudação espontânea vale mais que a resposta à probe
+                s.settimeout(min(ESPERA_SAUDACAO, timeout))
+                try:
+                    data = s.recv(2048)
+                    return _clean_banner(data)
+                except socket.timeout:
+                    probe = PROBE_GENERICA
             s.settimeout(timeout)
             if probe:
                 try:
@@ -190,14 +378,67 @@ def banner_grabbing(ip: str, porta: int, timeout: float = 2.5) -> str:
                 except Exception:
                     pass
             data = _recv_small(s)
-            return _clean_banner(data.decode(errors="ignore"))
+            return _clean_banner(data)
     except Exception:
         return "-"
 
 
-def re_search_i(pattern: str, text: str) -> Optional[str]:
-    """Regex case-insensitive, retorna primeiro grupo ou None."""
-    m = re.search(pattern, text or "", flags=re.IGNORECASE)
+def _numero_apos(texto: str, chaves: Tuple[str, ...], decimal: bool = False) -> Optional[str]:
+    """
+    Número logo depois da 1ª chave encontrada (ex.: "ttl=" -> "64"), por
+    `str.find` + varredura curta; `texto` já em minúsculas.
+    """
+    n = len(texto)
+    for chave in chaves:
+        i = texto.find(chave)
+        if i < 0:
+            continue
+        i += len(chave)
+        while i < n and texto[i] == " ":
+            i += 1
+        j = i
+        while j < n and (texto[j].isdigit() or (decimal and texto[j] == ".")):
+            j += 1
+        if j > i:
+            return texto[i:j]
+    return None
+
+
+def _eh_mac(s: str) -> bool:
+    """"xx:xx:xx:xx:xx:xx" (17 chars, ':' nas posições 2/5/8/11/14)."""
+    return (
+        len(s) == 17
+        and all(s[k] == ":" for k in (2, 5, 8, 11, 14))
+        and all(s[k] in _HEX for k in range(17) if k % 3 != 2)
+    )
+
+
+def _primeiro_mac(texto: str, apos: str = "") -> Optional[str]:
+    """1º MAC com ':' no texto (ou logo após `apos`, ex.: "lladdr "), sem regex."""
+    if apos:
+        i = texto.find(apos)
+        if i < 0:
+            return None
+        cand = texto[i + len(apos):].lstrip()[:17]
+        return cand if _eh_mac(cand) else None
+    i = texto.find(":", 2)
+    while i >= 0:
+        cand = texto[i - 2:i + 15]
+        if _eh_mac(cand):
+            return cand
+        i = texto.find(":", i + 1)
+    return None
+
+
+def re_search_i(pattern, text: str) -> Optional[str]:
+    """
+    Regex case-insensitive, retorna primeiro grupo ou None.
+    `pattern` já compilado (flags dele) ou str (compilada com IGNORECASE).
+    """
+    if isinstance(pattern, str):
+        m = re.search(pattern, text or "", flags=re.IGNORECASE)
+    else:
+        m = pattern.search(text or "")
     return m.group(1) if m else None
 
 
@@ -205,7 +446,7 @@ def parse_http_server(banner: str) -> str:
     """Extrai 'Server: ...' se existir (útil para casar produto/versão)."""
     if not banner or banner == "-":
         return banner
-    v = re_search_i(r"\bserver:\s*([^\r\n]+)", banner)
+    v = re_search_i(_RE_HTTP_SERVER, banner)
     return _clean_banner(f"Server: {v}") if v else banner
 
 
@@ -213,9 +454,136 @@ def parse_http_server(banner: str) -> str:
 # Ping / TTL / Latência / Hostname / MAC / SO
 # ============================
 
+_ICMP_ECHO = struct.Struct("!BBHHH")        # type, code, checksum, id, seq
+_ICMP_PAYLOAD = b"verificador_hosts"
+_IP_RECVTTL = getattr(socket, "IP_RECVTTL", 12)  # Linux; ausente no módulo em algumas versões
+_icmp_seq = itertools.count(1)
+
+
+def _checksum_icmp(dados: bytes) -> int:
+    """Checksum da internet (RFC 1071)."""
+    if len(dados) % 2:
+        dados += b"\0"
+    soma = sum(struct.unpack(f"!{len(dados) // 2}H", dados))
+    soma = (soma >> 16) + (soma & 0xFFFF)
+    soma += soma >> 16
+    return ~soma & 0xFFFF
+
+
+def _abrir_socket_icmp() -> Optional[socket.socket]:
+    """
+    Socket ICMP: SOCK_DGRAM (Linux/macOS sem root, se `ping_group_range`
+    permitir) ou SOCK_RAW (root/admin). None => usar o `ping` do SO.
+    """
+    for modo in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            s = socket.socket(socket.AF_INET, modo, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        if modo == socket.SOCK_DGRAM:
+            try:
+                s.setsockopt(socket.IPPROTO_IP, _IP_RECVTTL, 1)  # TTL vem como dado auxiliar
+            except OSError:
+                pass
+        return s
+    return None
+
+
+class PingerICMP:
+    """
+    UM socket ICMP para o processo inteiro: as threads dos hosts só enviam o
+    echo request e esperam um Event; uma thread leitora recebe todos os
+    replies e entrega cada um pelo par (ip, seq). Sem fork/exec de `ping`,
+    sem um socket por host (e, no raw, sem cada socket receber uma cópia do
+    ICMP de todos os outros), sem parse de texto.
+    TTL sai do cabeçalho IP (raw/macOS) ou do dado auxiliar IP_TTL (dgram Linux).
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._dgram = sock.type == socket.SOCK_DGRAM  # no dgram o kernel troca o id pelo seu
+        self._ident = os.getpid() & 0xFFFF
+        self._lock = threading.Lock()
+        self._pendentes: Dict[Tuple[str, int], list] = {}  # (ip, seq) -> [Event, ttl, t_resposta]
+        threading.Thread(target=self._receber, name="icmp-rx", daemon=True).start()
+
+    def ping(self, ip: str, timeout: float = PING_TIMEOUT) -> Tuple[bool, int, float]:
+        """1 echo request; retorna (online, ttl, lat_ms)."""
+        seq = next(_icmp_seq) & 0xFFFF
+        pacote = _ICMP_ECHO.pack(8, 0, 0, self._ident, seq) + _ICMP_PAYLOAD
+        pacote = _ICMP_ECHO.pack(8, 0, _checksum_icmp(pacote), self._ident, seq) + _ICMP_PAYLOAD
+
+        chave = (ip, seq)
+        espera = [threading.Event(), -1, 0.0]
+        with self._lock:
+            self._pendentes[chave] = espera
+        try:
+            t0 = time.monotonic()
+            try:
+                self._sock.sendto(pacote, (ip, 0))
+            except OSError:
+                return (False, -1, -1.0)  # sem rota / rede inalcançável
+            if not espera[0].wait(timeout):
+                return (False, -1, -1.0)
+            return (True, espera[1], round((espera[2] - t0) * 1000, 2))
+        finally:
+            with self._lock:
+                self._pendentes.pop(chave, None)
+
+    def _receber(self) -> None:
+        usar_recvmsg = self._dgram and hasattr(self._sock, "recvmsg")
+        while True:
+            ttl = -1
+            try:
+                if usar_recvmsg:
+                    dados, anc, _, origem = self._sock.recvmsg(2048, socket.CMSG_SPACE(4))
+                    for nivel, tipo, valor in anc:
+                        if nivel == socket.IPPROTO_IP and tipo == socket.IP_TTL and len(valor) >= 4:
+                            ttl = int.from_bytes(valor[:4], sys.byteorder)
+                else:
+                    dados, origem = self._sock.recvfrom(2048)
+            except OSError:
+                time.sleep(0.01)  # erro transitório; não girar em falso
+                continue
+            t_resposta = time.monotonic()
+
+            if dados and dados[0] >> 4 == 4:  # veio com cabeçalho IP (raw, dgram no macOS)
+                ttl = dados[8]
+                dados = dados[(dados[0] & 0x0F) * 4:]
+            if len(dados) < _ICMP_ECHO.size:
+                continue
+            tipo, _, _, rid, rseq = _ICMP_ECHO.unpack_from(dados)
+            if tipo != 0 or (not self._dgram and rid != self._ident):
+                continue  # raw recebe todo ICMP da máquina
+
+            with self._lock:
+                espera = self._pendentes.get((origem[0], rseq))
+            if espera is not None:
+                espera[1] = ttl
+                espera[2] = t_resposta
+                espera[0].set()
+
+
+_PINGER: Optional[PingerICMP] = None
+_PINGER_TENTADO = False
+_PINGER_LOCK = threading.Lock()
+
+
+def _pinger() -> Optional[PingerICMP]:
+    """`PingerICMP` do processo (criado na 1ª chamada); None se não há socket ICMP."""
+    global _PINGER, _PINGER_TENTADO
+    if not _PINGER_TENTADO:
+        with _PINGER_LOCK:
+            if not _PINGER_TENTADO:
+                s = _abrir_socket_icmp()
+                _PINGER = PingerICMP(s) if s is not None else None
+                _PINGER_TENTADO = True
+    return _PINGER
+
+
 def _ping_args(ip: str) -> List[str]:
     """Monta args do ping conforme SO."""
-    if platform.system().lower().startswith("win"):
+    if _IS_WIN:
         return ["ping", "-n", "1", "-w", "1200", ip]
     else:
         return ["ping", "-c", "1", "-W", "1", ip]
@@ -225,23 +593,31 @@ def ping_host(ip: str) -> Tuple[bool, int, float]:
     """
     Executa 1 ping e tenta extrair TTL e latência (ms).
     Retorna (online, ttl, lat_ms) — ttl=-1/lat=-1 se não obtido.
+    Usa socket ICMP quando possível; senão, o binário `ping` do SO.
     """
+    if PING_SOCKET:
+        pinger = _pinger()
+        if pinger is not None:
+            return pinger.ping(ip)
+
     ttl, lat = -1, -1.0
     try:
         p = subprocess.run(_ping_args(ip), capture_output=True, text=True, timeout=3)
-        out = p.stdout + p.stderr
-        online = p.returncode == 0 or ("bytes=" in out.lower() or "ttl=" in out.lower())
+        out = (p.stdout + p.stderr).lower()  # minúsculas uma vez só
+        online = p.returncode == 0 or ("bytes=" in out or "ttl=" in out)
         if not online:
             return False, -1, -1.0
 
-        # Latência
-        mlat = re_search_i(r"time[=<]\s*([0-9]+(?:\.[0-9]+)?)\s*ms", out) or \
-               re_search_i(r"tempo[=<]\s*([0-9]+(?:\.[0-9]+)?)\s*ms", out)
+        # Latência ("time=0.04 ms", "time<1ms", "tempo=12ms")
+        mlat = _numero_apos(out, ("time=", "time<", "tempo=", "tempo<"), decimal=True)
         if mlat:
-            lat = float(mlat)
+            try:
+                lat = float(mlat)
+            except ValueError:
+                pass
 
-        # TTL
-        mttl = re_search_i(r"ttl[=\s]\s*([0-9]+)", out)
+        # TTL ("ttl=64", "TTL=128")
+        mttl = _numero_apos(out, ("ttl=", "ttl "))
         if mttl:
             ttl = int(mttl)
 
@@ -258,6 +634,18 @@ def resolver_hostname(ip: str) -> str:
         return "N/D"
 
 
+def resolver_hostnames(ips: List[str], workers: int = 16) -> Dict[str, str]:
+    """
+    DNS inverso de vários IPs de uma vez, depois do scan: o PTR (às vezes
+    segundos em rede com DNS ruim) não entra no tempo de cada host, e as
+    consultas saem concorrentes em vez de uma por host.
+    """
+    if not ips:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ips)))) as ex:
+        return dict(zip(ips, ex.map(resolver_hostname, ips)))
+
+
 def obter_mac_via_arp(ip: str) -> str:
     """
     Tenta extrair MAC da tabela ARP.
@@ -265,30 +653,75 @@ def obter_mac_via_arp(ip: str) -> str:
     Linux:   `ip neigh` (fallback `arp -n`)
     """
     try:
-        if platform.system().lower().startswith("win"):
+        if _IS_WIN:
             p = subprocess.run(["arp", "-a", ip], capture_output=True, text=True, timeout=2)
-            out = p.stdout
-            mm = re.search(rf"{re.escape(ip)}\s+([0-9a-fA-F\-\:]+)", out)
-            if mm:
-                mac = mm.group(1).replace("-", ":").lower()
-                return mac
+            for linha_ip, mac in _RE_ARP_WIN.findall(p.stdout):
+                if linha_ip == ip:
+                    return mac.replace("-", ":").lower()
         else:
             p = subprocess.run(["ip", "neigh", "show", ip], capture_output=True, text=True, timeout=2)
             out = p.stdout
-            mm = re.search(r"lladdr\s+([0-9a-fA-F:]{17})", out)
-            if mm:
-                return mm.group(1).lower()
+            mac = _primeiro_mac(out, "lladdr ")
+            if mac:
+                return mac.lower()
             # fallback
             p = subprocess.run(["arp", "-n", ip], capture_output=True, text=True, timeout=2)
             out = p.stdout
-            mm = re.search(r"([0-9a-fA-F:]{17})", out)
-            if mm:
-                return mm.group(1).lower()
+            mac = _primeiro_mac(out)
+            if mac:
+                return mac.lower()
     except Exception:
         pass
     return "N/D"
 
 
+def carregar_tabela_arp() -> Optional[Dict[str, str]]:
+    """
+    Tabela ARP inteira de uma vez, {ip: mac} (mac em minúsculas com ':').
+    Linux: lê `/proc/net/arp` (sem fork); Windows: um único `arp -a`.
+    Entradas incompletas (flags 0x0 / MAC zerado) ficam de fora.
+    Outros SOs (ou falha): None — quem chama cai em `obter_mac_via_arp`.
+    """
+    tabela: Dict[str, str] = {}
+    try:
+        if _IS_WIN:
+            p = subprocess.run(["arp", "-a"], capture_output=True, text=True, timeout=5)
+            for ip, mac in _RE_ARP_WIN.findall(p.stdout):
+                tabela[ip] = mac.replace("-", ":").lower()
+        elif os.path.exists("/proc/net/arp"):
+            with open("/proc/net/arp", "r") as f:
+                next(f, None)  # cabeçalho
+                for linha in f:
+                    campos = linha.split()
+                    # IP, HW type, Flags, HW address, Mask, Device
+                    if len(campos) >= 4 and campos[2] != "0x0" and campos[3] != "00:00:00:00:00:00":
+                        tabela[campos[0]] = campos[3].lower()
+        else:
+            return None
+    except Exception:
+        return None
+    return tabela
+
+
+def resolver_macs(ips: List[str], fabricantes: Dict[int, str]) -> Dict[str, Tuple[str, str]]:
+    """
+    MAC e fabricante de vários IPs: a tabela ARP (já populada pelos pings) é
+    lida uma vez por chamada, em vez de um `arp`/`ip neigh` por host. Chame
+    logo após os hosts responderem (o __main__ chama a cada lote): entradas
+    de vizinho envelhecem e saem da tabela em poucos minutos.
+    A tabela é a mesma que `ip neigh`/`arp` mostrariam (no Linux, o mesmo
+    cache de vizinhos do kernel): IP fora dela fica "N/D", sem subprocess.
+    Só sem tabela (SO não suportado/falha) cai em `obter_mac_via_arp` por IP.
+    Retorna {ip: (mac, fabricante)}.
+    """
+    tabela = carregar_tabela_arp()
+    resultado: Dict[str, Tuple[str, str]] = {}
+    for ip in ips:
+        mac = tabela.get(ip, "N/D") if tabela is not None else obter_mac_via_arp(ip)
+        resultado[ip] = (mac, _fabricante_por_mac(mac, fabricantes))
+    return resultado
+
+
 def detectar_so_por_ttl(ttl: int) -> str:
     """
     Heurística simples:
@@ -311,144 +744,427 @@ def detectar_so_por_ttl(ttl: int) -> str:
 # Portscan paralelo (usa probes)
 # ============================
 
-def _testar_porta(ip: str, porta: int, timeout: float) -> Tuple[int, str]:
-    """Conecta e coleta banner se aberto. Retorna (porta, banner|'-')."""
-    # Testa apenas a conexão (controlada)
+async def _adquirir_socket() -> None:
+    """`SOCKET_SEM` (global, entre threads) sem travar o event loop do host."""
+    while not SOCKET_SEM.acquire(blocking=False):
+        await asyncio.sleep(0.005)
+
+
+async def _ler_banner(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, ip: str, porta: int, timeout: float,
+    ja_enviado: int = 0,
+) -> Optional[str]:
+    """
+    Banner na MESMA conexão do teste de porta: saudação (servidor fala
+    primeiro), probe por protocolo ou ouvir-e-depois-sondar (`_probe_da_porta`);
+    nas portas TLS, handshake por cima do socket já aberto.
+    `ja_enviado`: bytes da probe que já saíram no SYN (TCP Fast Open).
+    None => TLS sem `StreamWriter.start_tls` (Python < 3.11): usar `banner_grabbing`.
+    """
+    try:
+        if porta in PORTAS_TLS:
+            if not hasattr(writer, "start_tls"):
+                return None
+            await asyncio.wait_for(
+                writer.start_tls(_SSL_CTX, server_hostname=ip), timeout
+            )
+            probe = _probe_tls(ip, porta)
+        else:
+            probe = _probe_da_porta(porta)
+        if probe is None:
+            # ouve antes de falar: saudação espontânea vale mais que a resposta à probe
+            try:
+                data = await asyncio.wait_for(reader.read(2048), min(ESPERA_SAUDACAO, timeout))
+                return _clean_banner(data)
+            except asyncio.TimeoutError:
+                probe = PROBE_GENERICA
+                timeout = max(timeout - ESPERA_SAUDACAO, ESPERA_SAUDACAO)
+        if probe and ja_enviado:
+            probe = probe[ja_enviado:]
+        if probe:
+            try:
+                writer.write(probe)
+                await asyncio.wait_for(writer.drain(), timeout)
+            except Exception:
+                pass
+        data = await asyncio.wait_for(reader.read(2048), timeout)
+        return _clean_banner(data)
+    except Exception:
+        return "-"
+
+
+async def _fechar(writer: asyncio.StreamWriter) -> None:
+    writer.close()
     try:
-        with open_conn(ip, porta, timeout):
-            pass  # conectou -> aberta
+        await asyncio.wait_for(writer.wait_closed(), 1.0)
     except Exception:
-        return (porta, "-")
+        pass
+
+
+async def _abrir_com_tfo(ip: str, porta: int, probe: bytes):
+    """
+    Connect com TCP Fast Open: `sendto(MSG_FASTOPEN)` dispara o SYN levando a
+    probe se já houver cookie do servidor (economiza um RTT); sem cookie
+    (EINPROGRESS) sai um SYN comum e a probe vai depois, como no caminho normal.
+    Retorna (reader, writer, bytes_da_probe_ja_enviados).
+    """
+    global TCP_FASTOPEN
+    loop = asyncio.get_running_loop()
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setblocking(False)
+    try:
+        try:
+            enviado = s.sendto(probe, socket.MSG_FASTOPEN, (ip, porta))
+        except BlockingIOError:
+            enviado = 0
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOPROTOOPT):
+                TCP_FASTOPEN = False  # kernel/SO sem TFO: não tenta de novo
+            raise
+        try:
+            await loop.sock_connect(s, (ip, porta))
+        except OSError as e:
+            # com cookie o SYN (com dados) já pode ter completado o handshake
+            # dentro do sendto: aí connect() responde EISCONN — é porta aberta
+            if e.errno != errno.EISCONN:
+                raise
+        reader, writer = await asyncio.open_connection(sock=s)
+    except BaseException:
+        s.close()
+        raise
+    return reader, writer, enviado
+
+
+async def _conectar_e_ler(ip: str, porta: int, timeout: float) -> Optional[str]:
+    """
+    Connect não bloqueante (timeout limitado pelo RTT da rede) e, se abriu,
+    banner na mesma conexão, tudo dentro do limite global de sockets.
+    Conexões que respondem (aceitas ou recusadas) alimentam `RTT_GLOBAL`.
+    Retorna banner, "-" (fechada/sem banner) ou None (ver `_ler_banner`).
+    """
+    await _adquirir_socket()
+    try:
+        probe = _probe_da_porta(porta) if porta not in PORTAS_TLS else None
+        usar_tfo = TCP_FASTOPEN and bool(probe)
+        t0 = time.monotonic()
+        try:
+            if usar_tfo:
+                try:
+                    reader, writer, enviado = await asyncio.wait_for(
+                        _abrir_com_tfo(ip, porta, probe), RTT_GLOBAL.timeout_conexao(timeout)
+                    )
+                except OSError as e:
+                    if isinstance(e, ConnectionRefusedError) or TCP_FASTOPEN:
+                        raise
+                    usar_tfo = False  # TFO indisponível: connect normal abaixo
+            if not usar_tfo:
+                enviado = 0
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(ip, porta), RTT_GLOBAL.timeout_conexao(timeout)
+                )
+        except ConnectionRefusedError:
+            RTT_GLOBAL.observar(time.monotonic() - t0)  # RST também é uma resposta
+            return "-"
+        except (OSError, asyncio.TimeoutError):
+            return "-"
+        RTT_GLOBAL.observar(time.monotonic() - t0)
+        try:
+            return await _ler_banner(reader, writer, ip, porta, timeout, enviado)
+        finally:
+            await _fechar(writer)
+    finally:
+        SOCKET_SEM.release()
 
-    # Coleta banner (nova conexão controlada)
-    banner = banner_grabbing(ip, porta, timeout=timeout)
+
+async def _conectar_tcp(ip: str, porta: int, timeout: float) -> Optional[float]:
+    """Só o connect: segundos até SYN-ACK ou RST (ambos = host vivo); None sem resposta."""
+    await _adquirir_socket()
+    try:
+        t0 = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, porta), timeout)
+        except ConnectionRefusedError:
+            return time.monotonic() - t0
+        except (OSError, asyncio.TimeoutError):
+            return None
+        rtt = time.monotonic() - t0
+        await _fechar(writer)
+        return rtt
+    finally:
+        SOCKET_SEM.release()
+
+
+async def _descobrir_tcp(ip: str, portas: Tuple[int, ...], timeout: float) -> Optional[float]:
+    """
+    Descoberta por TCP (como o host discovery do nmap): connects paralelos em
+    `portas`; a 1ª resposta encerra as demais. Retorna latência (ms) ou None.
+    """
+    tarefas = [asyncio.ensure_future(_conectar_tcp(ip, p, timeout)) for p in portas]
+    try:
+        for proxima in asyncio.as_completed(tarefas):
+            rtt = await proxima
+            if rtt is not None:
+                return round(rtt * 1000, 2)
+        return None
+    finally:
+        for t in tarefas:
+            t.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+async def _testar_porta(ip: str, porta: int, timeout: float, limite: asyncio.Semaphore) -> Tuple[int, str]:
+    """Conecta e coleta banner se aberto (uma conexão só). Retorna (porta, banner|'-')."""
+    async with limite:
+        banner = await _conectar_e_ler(ip, porta, timeout)
+        if banner is None:
+            # TLS sem start_tls: nova conexão, bloqueante, fora do loop
+            banner = await asyncio.to_thread(banner_grabbing, ip, porta, timeout)
     if porta in (80, 8080, 8000, 8888, 8443, 443):
         banner = parse_http_server(banner)
     return (porta, banner if banner else "-")
 
 
-def testar_portas(ip: str, portas: List[int], timeout: float = 2.5, workers: int = 64) -> List[str]:
+async def _testar_portas_async(
+    ip: str, portas: List[int], timeout: float, workers: int,
+    parar_apos: int = 0, prazo: float = 0,
+) -> List[Tuple[int, str]]:
     """
-    Retorna lista **somente** das portas abertas no formato "porta:banner".
+    Todas as portas do host no loop, no máximo `workers` em voo.
+    `parar_apos` (N portas abertas) / `prazo` (s): cancela as restantes e
+    devolve só as já concluídas (0 = sem corte). Ordem de `portas` mantida.
     """
-    resultados: List[str] = []
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futuros = [ex.submit(_testar_porta, ip, p, timeout) for p in portas]
-        for fut in as_completed(futuros):
-            porta, banner = fut.result()
-            if banner and banner != "-":
-                resultados.append(f"{porta}:{banner}")
-    # ordena por porta
+    limite = asyncio.Semaphore(max(1, workers))  # portas em voo por host (knob do governor)
+    if not parar_apos and not prazo:
+        return await asyncio.gather(*(_testar_porta(ip, p, timeout, limite) for p in portas))
+
+    tarefas = [asyncio.ensure_future(_testar_porta(ip, p, timeout, limite)) for p in portas]
+    abertas = 0
     try:
-        resultados.sort(key=lambda x: int(x.split(":", 1)[0]))
-    except Exception:
-        resultados.sort()
-    return resultados
+        for proxima in asyncio.as_completed(tarefas, timeout=prazo or None):
+            _, banner = await proxima
+            if banner != "-":
+                abertas += 1
+                if parar_apos and abertas >= parar_apos:
+                    break
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for t in tarefas:
+            t.cancel()  # no-op nas concluídas; fecha as conexões em voo
+        await asyncio.gather(*tarefas, return_exceptions=True)
+    return [t.result() for t in tarefas if not t.cancelled() and t.exception() is None]
+
+
+_LOOP_PORTAS: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_PORTAS_LOCK = threading.Lock()
+
+
+def _loop_portas() -> asyncio.AbstractEventLoop:
+    """
+    Event loop único do portscan, numa thread daemon (criado na 1ª chamada):
+    as portas de TODOS os hosts em voo dividem o mesmo selector, em vez de um
+    loop (e um epoll) por host.
+    """
+    global _LOOP_PORTAS
+    if _LOOP_PORTAS is None:
+        with _LOOP_PORTAS_LOCK:
+            if _LOOP_PORTAS is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="portscan-loop", daemon=True).start()
+                _LOOP_PORTAS = loop
+    return _LOOP_PORTAS
+
+
+async def _testar_portas_especulativo(
+    ip: str, portas: List[int], timeout: float, workers: int, liberado: asyncio.Event, atraso: float
+) -> List[Tuple[int, str]]:
+    """
+    Portscan que não espera o ping terminar: sai quando `liberado` é setado
+    (ping respondeu) ou após `atraso` s, o que vier antes. Assim o timeout
+    de um ping lento não serializa na frente das portas; se o ping falhar,
+    quem chamou cancela o Future e as conexões em voo são fechadas.
+    """
+    try:
+        await asyncio.wait_for(liberado.wait(), atraso)
+    except asyncio.TimeoutError:
+        pass
+    return await _testar_portas_async(ip, portas, timeout, workers, PARAR_APOS_ABERTAS, PRAZO_PORTAS)
+
+
+_chave_porta = itemgetter(0)
+
+
+def _formatar_portas(pares: List[Tuple[int, str]]) -> List[str]:
+    """
+    (porta, banner) -> "porta:banner", somente as abertas, por número de porta.
+    Ordena só as abertas e pela porta int que já vem no par (sem `split`/`int`
+    na string); `PORTAS_COMUNS` vai na ordem de disparo, não numérica.
+    """
+    abertas = [par for par in pares if par[1] and par[1] != "-"]
+    abertas.sort(key=_chave_porta)
+    return [f"{porta}:{banner}" for porta, banner in abertas]
+
+
+def testar_portas(
+    ip: str, portas: List[int], timeout: float = 2.5, workers: int = 64,
+    parar_apos: int = 0, prazo: float = 0,
+) -> List[str]:
+    """
+    Retorna lista **somente** das portas abertas no formato "porta:banner".
+    As sondas rodam no event loop compartilhado (`_loop_portas`), que
+    multiplexa os connects de todos os hosts (epoll/kqueue/IOCP); a thread do
+    host só espera o resultado. `workers` limita as portas em voo deste host.
+    O banner é lido na mesma conexão que detectou a porta aberta.
+    `parar_apos`/`prazo`: corte antecipado (ver `_testar_portas_async`).
+    """
+    return _formatar_portas(asyncio.run_coroutine_threadsafe(
+        _testar_portas_async(ip, portas, timeout, workers, parar_apos, prazo), _loop_portas()
+    ).result())
 
 
 # ============================
 # Função principal por host (chamada pelo __main__.py)
 # ============================
 
-import re
+@lru_cache(maxsize=4096)
+def _chaves_oui(mac: str) -> Tuple[int, ...]:
+    """
+    Chaves do MAC na tabela OUI, do maior prefixo ao menor (/36, /28, /24).
+    Memoizado: na varredura de uma sub-rede o mesmo MAC/OUI volta várias vezes,
+    e a normalização (str.replace, em C) + shifts sai do cache.
+    """
+    hexs = mac.replace(":", "").replace("-", "")[:9]   # ex.: 80854495F
+    n_hex = len(hexs)
+    if n_hex < 6:
+        return ()
+    try:
+        valor = int(hexs, 16)
+    except ValueError:
+        return ()
+    return tuple(
+        (valor >> (4 * (n_hex - n))) | (1 << (4 * n))
+        for n in (9, 7, 6) if n <= n_hex
+    )
+
 
-def _fabricante_por_mac(mac: str, fabricantes: Dict[str, str]) -> str:
-    """Retorna fabricante tentando OUI de 3, 4 e 5 bytes (plain e com ':')."""
+def _fabricante_por_mac(mac: str, fabricantes: Dict[int, str]) -> str:
+    """
+    Retorna fabricante pelo maior prefixo conhecido: /36, /28 e /24.
+    Chaves int com nibble-sentinela (ver `utils.carregar_tabela_oui`); as
+    chaves do MAC vêm memoizadas de `_chaves_oui`.
+    """
     if not mac or mac in ("N/D", "MAC N/D", "-"):
         return "N/D"
-    hexs = re.sub(r"[^0-9A-Fa-f]", "", mac).upper()   # ex.: 80854495F30E
-    if len(hexs) < 6:
-        return "N/D"
-    keys = []
-    for n in (6, 8, 10):  # 3,4,5 bytes
-        if len(hexs) >= n:
-            plain = hexs[:n]
-            colon = ':'.join(plain[i:i+2] for i in range(0, n, 2))
-            if plain in fabricantes: return fabricantes[plain]
-            if colon in fabricantes: return fabricantes[colon]
+    for chave in _chaves_oui(mac):
+        nome = fabricantes.get(chave)
+        if nome is not None:
+            return nome
     return 'N/D'
 
 
-
 def verificar_host(
     ip: str,
-    fabricantes: Dict[str, str],
+    fabricantes: Dict[int, str],
     max_workers_portas: int,
     timeout_socket: float,
-    base_cves
-) -> Dict[str, object]:
+    base_cves,
+    verificar_cves: bool = True,
+    resolver_mac: bool = True,
+) -> HostResult:
     """
     ## verificar_host
-    - Ping + TTL + latência
-    - Hostname (opcional por ENV)
-    - MAC e fabricante
+    - Ping + TTL + latência, com o portscan já disparado em paralelo
+      (`ESPECULACAO_PORTAS`) e cancelado se o host não responder
+    - Sem eco ICMP, vale resposta TCP em `PORTAS_DESCOBERTA` (`DESCOBERTA_TCP`,
+      disparada junto com o ping); aí TTL fica -1
+    - Hostname fica "N/D" (resolvido em lote depois, por `resolver_hostnames`)
+    - MAC e fabricante (ou "N/D", se `resolver_mac=False`: em lote depois,
+      por `resolver_macs`)
     - SO (por TTL)
     - Portscan + banners
-    - Vulnerabilidades (usa cve.verificar_vulnerabilidades_em_banners)
-
-    Retorno (campos compatíveis com relatorio.py):
-    {
-        "ip": str,
-        "status": "ONLINE"/"OFFLINE",
-        "nome": str,
-        "mac": str,
-        "fabricante": str,
-        "so": str,
-        "portas": List[str],
-        "banners": List[str],
-        "vulnerabilidades": List[str],
-        "latencia": float
-    }
+    - Vulnerabilidades (usa cve.verificar_vulnerabilidades_em_banners),
+      só se `verificar_cves` e houver banners
+
+    Retorno: `HostResult` (campos usados por relatorio.py).
     """
+    loop = _loop_portas()
+    futuro_tcp = None
+    if DESCOBERTA_TCP:
+        futuro_tcp = asyncio.run_coroutine_threadsafe(
+            _descobrir_tcp(ip, PORTAS_DESCOBERTA, PING_TIMEOUT), loop
+        )
+    futuro_portas = None
+    if ESPECULACAO_PORTAS >= 0:
+        liberado = asyncio.Event()
+        futuro_portas = asyncio.run_coroutine_threadsafe(
+            _testar_portas_especulativo(
+                ip, PORTAS_COMUNS, float(timeout_socket), int(max_workers_portas),
+                liberado, ESPECULACAO_PORTAS,
+            ),
+            loop,
+        )
+
     online, ttl, latencia = ping_host(ip)
+    if futuro_tcp is not None:
+        if online:
+            futuro_tcp.cancel()
+        else:
+            try:
+                latencia_tcp = futuro_tcp.result()
+            except Exception:
+                latencia_tcp = None
+            if latencia_tcp is not None:
+                online, latencia = True, latencia_tcp
     if not online:
-        return {
-            "ip": ip,
-            "status": "OFFLINE",
-            "nome": "N/D",
-            "mac": "N/D",
-            "fabricante": "N/D",
-            "so": "N/D",
-            "portas": [],
-            "banners": [],
-            "vulnerabilidades": [],
-            "latencia": -1.0,
-        }
-
-    nome = resolver_hostname(ip) if RESOLVE_HOSTNAME else "N/D"
-    mac = obter_mac_via_arp(ip)
-    fabricante = _fabricante_por_mac(mac, fabricantes)
+        if futuro_portas is not None:
+            futuro_portas.cancel()
+        return HostResult.offline(ip)
+    if futuro_portas is not None:
+        loop.call_soon_threadsafe(liberado.set)
+
+    nome = "N/D"
+    if resolver_mac:
+        mac = obter_mac_via_arp(ip)
+        fabricante = _fabricante_por_mac(mac, fabricantes)
+    else:
+        mac = fabricante = "N/D"
     so = detectar_so_por_ttl(ttl)
 
-    # Portscan
-    banners_abertas = testar_portas(
-        ip,
-        PORTAS_COMUNS,
-        timeout=float(timeout_socket),
-        workers=int(max_workers_portas),
-    )
+    # Portscan (especulativo já em voo, ou agora)
+    if futuro_portas is not None:
+        banners_abertas = _formatar_portas(futuro_portas.result())
+    else:
+        banners_abertas = testar_portas(
+            ip,
+            PORTAS_COMUNS,
+            timeout=float(timeout_socket),
+            workers=int(max_workers_portas),
+            parar_apos=PARAR_APOS_ABERTAS,
+            prazo=PRAZO_PORTAS,
+        )
     portas = [b.split(":", 1)[0] for b in banners_abertas]
     banners = banners_abertas[:]  # já no formato "porta:banner"
 
     # Vulnerabilidades (usa cve.verificar_vulnerabilidades_em_banners; base_cves é ignorado na nova versão)
-    try:
-        from cve import verificar_vulnerabilidades_em_banners
-        confirmadas, suspeitas = verificar_vulnerabilidades_em_banners(
-            banners, base_cves, detalhado=True
-        )
-        vulns = [*confirmadas, *[f"{cve} (suspeita)" for cve in suspeitas]]
-    except Exception:
-        vulns = []
-
-    return {
-        "ip": ip,
-        "status": "ONLINE",
-        "nome": nome,
-        "mac": mac,
-        "fabricante": fabricante,
-        "so": so,
-        "portas": portas,
-        "banners": banners,
-        "vulnerabilidades": vulns,
-        "latencia": latencia,
-    }
+    vulns: List[str] = []
+    if verificar_cves and banners and verificar_vulnerabilidades_em_banners is not None:
+        try:
+            confirmadas, suspeitas = verificar_vulnerabilidades_em_banners(
+                banners, base_cves, detalhado=True
+            )
+            vulns = [*confirmadas, *[f"{cve} (suspeita)" for cve in suspeitas]]
+        except Exception:
+            vulns = []
+
+    return HostResult(
+        ip=ip,
+        status="ONLINE",
+        nome=nome,
+        mac=mac,
+        fabricante=fabricante,
+        so=so,
+        portas=portas,
+        banners=banners,
+        vulnerabilidades=vulns,
+        latencia=latencia,
+    )
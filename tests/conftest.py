@@ -0,0 +1,11 @@
+"""
+Testes do verificador: os módulos vivem na raiz do repositório (sem pacote),
+então a raiz entra no sys.path para `import scan`, `import cve`, etc.
+"""
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
@@ -0,0 +1,85 @@
+"""Índice CVE (`cve`): parse de CPE 2.3 e API em lote igual à por host."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+import cve
+
+
+def _item(cve_id: str, cpe: str, **faixa) -> dict:
+    match = {"vulnerable": True, "cpe23Uri": cpe, **faixa}
+    return {
+        "cve": {"CVE_data_meta": {"ID": cve_id}},
+        "configurations": {"nodes": [{"operator": "OR", "cpe_match": [match]}]},
+    }
+
+
+FEED = {"CVE_Items": [
+    _item("CVE-0001", "cpe:2.3:a:apache:http_server:*:*:*:*:*:*:*:*",
+          versionStartIncluding="2.4.0", versionEndExcluding="2.4.50"),
+    _item("CVE-0002", "cpe:2.3:a:apache:http_server:2.4.49:*:*:*:*:*:*:*"),
+    _item("CVE-0003", "cpe:2.3:a:openbsd:openssh:*:*:*:*:*:*:*:*", versionEndIncluding="8.2"),
+    _item("CVE-0004", "cpe:2.3:a:nginx:nginx:*:*:*:*:*:*:*:*"),
+    # sem o prefixo cpe:2.3: / part fora do filtro: fora do índice
+    _item("CVE-0005", "xpe:2.3:a:nginx:nginx:*:*:*:*:*:*:*:*"),
+    _item("CVE-0006", "cpe:2.3:o:linux:linux_kernel:*:*:*:*:*:*:*:*"),
+]}
+
+BANNERS = {
+    "10.0.0.1": ["80:Server: Apache/2.4.49 (Unix)", "22:OpenSSH_8.2p1 Ubuntu"],
+    "10.0.0.2": ["80:Server: Apache/2.4.49 (Unix)"],
+    "10.0.0.3": ["80:nginx/1.18.0", "22:OpenSSH_9.6"],
+    "10.0.0.4": ["21:banner sem versao"],
+    "10.0.0.5": [],
+}
+
+
+@pytest.fixture
+def indice(tmp_path, monkeypatch):
+    feeds = tmp_path / "feeds"
+    feeds.mkdir()
+    (feeds / f"nvdcve-1.1-{datetime.now().year}.json").write_text(json.dumps(FEED), encoding="utf-8")
+    monkeypatch.setattr(cve, "NVD_INDEX_CACHE", str(tmp_path / "nvd_index.marshal"))
+    monkeypatch.setattr(cve, "CPE_PART_ALLOWED", "a")
+    cve.construir_indice_cpe.cache_clear()
+    yield cve.construir_indice_cpe(str(feeds))
+    cve.construir_indice_cpe.cache_clear()
+
+
+def test_indice_sintetico(indice):
+    assert set(indice) == {("apache", "http_server"), ("openbsd", "openssh"), ("nginx", "nginx")}
+
+
+def test_lote_igual_ao_por_host(indice):
+    lote = cve.verificar_vulnerabilidades_em_lote(BANNERS)
+    assert list(lote) == list(BANNERS)
+    for host, banners in BANNERS.items():
+        assert lote[host] == cve.verificar_vulnerabilidades_em_banners(banners, detalhado=True)
+
+
+def test_lote_resumido_igual_ao_por_host(indice):
+    lote = cve.verificar_vulnerabilidades_em_lote(BANNERS, detalhado=False)
+    for host, banners in BANNERS.items():
+        assert lote[host] == cve.verificar_vulnerabilidades_em_banners(banners)
+
+
+def test_resultado_esperado(indice):
+    lote = cve.verificar_vulnerabilidades_em_lote(BANNERS)
+    assert sorted(lote["10.0.0.1"][0]) == ["CVE-0001", "CVE-0002", "CVE-0003"]
+    assert sorted(lote["10.0.0.2"][0]) == ["CVE-0001", "CVE-0002"]
+    assert "CVE-0004" in lote["10.0.0.3"][0]
+    assert lote["10.0.0.4"] == ([], [])
+    assert lote["10.0.0.5"] == ([], [])
+    todos = {c for confirmadas, suspeitas in lote.values() for c in (*confirmadas, *suspeitas)}
+    assert not todos & {"CVE-0005", "CVE-0006"}
+
+
+def test_parse_cpe23_exige_prefixo():
+    assert cve.parse_cpe23("cpe:2.3:a:apache:http_server:2.4.49:*:*:*") == {
+        "part": "a", "vendor": "apache", "product": "http_server", "version": "2.4.49",
+    }
+    assert cve.parse_cpe23("cpe:/a:apache:http_server:2.4.49:x:y") is None  # URI 2.2
+    assert cve.parse_cpe23("x:cpe:2.3:a:apache:http_server:2.4.49") is None
+    assert cve.parse_cpe23("") is None
@@ -0,0 +1,85 @@
+"""Governor AIMD (`governance.AdaptiveGovernor`): timeout e prazo por host."""
+
+from governance import AdaptiveGovernor
+
+
+def _governor(**kw) -> AdaptiveGovernor:
+    # sem cooldown: cada suggest() decide, para testar lote a lote
+    kw.setdefault("cool_down_lotes", 0)
+    return AdaptiveGovernor(batch_ini=10, hosts_ini=8, portas_ini=4, timeout_ini=2.0, **kw)
+
+
+def _registrar(gov: AdaptiveGovernor, duracao: float, n: int = 32) -> None:
+    for _ in range(n):
+        gov.latencias.registrar(duracao)
+
+
+def test_sobrecarga_com_cauda_lenta_sobe_timeout_e_corta_paralelismo():
+    gov = _governor()
+    ajustou, msg = gov.suggest(duracao_lote=1.0, timeouts=5, concluidos=10)
+    assert ajustou and "sobrecarga" in msg
+    assert gov.timeout == 2.5
+    assert gov.hosts == 5  # 8 * 0.7
+    assert gov.batch == 7  # 10 * 0.7
+
+
+def test_sobrecarga_com_cauda_rapida_nao_sobe_timeout():
+    gov = _governor()
+    _registrar(gov, 0.1)  # P99 << timeout: os timeouts são hosts travados
+    gov.suggest(duracao_lote=1.0, timeouts=5, concluidos=10)
+    assert gov.timeout == 2.0
+
+
+def test_timeout_respeita_teto():
+    gov = _governor(timeout_max=3.0)
+    for _ in range(5):
+        gov.suggest(duracao_lote=1.0, timeouts=5, concluidos=10)
+    assert gov.timeout == 3.0
+
+
+def test_lote_bom_devolve_timeout_ate_o_inicial():
+    gov = _governor()
+    for _ in range(3):
+        gov.suggest(duracao_lote=1.0, timeouts=5, concluidos=10)
+    assert gov.timeout == 3.5
+
+    vistos = []
+    for _ in range(5):
+        gov.suggest(duracao_lote=1.0, timeouts=0, concluidos=10)
+        vistos.append(gov.timeout)
+    assert vistos == [3.0, 2.5, 2.0, 2.0, 2.0]
+
+
+def test_lote_bom_nao_desce_timeout_abaixo_da_cauda():
+    gov = _governor()
+    gov.suggest(duracao_lote=1.0, timeouts=5, concluidos=10)
+    assert gov.timeout == 2.5
+    _registrar(gov, 3.0)  # P99 acima do timeout atual
+    gov.suggest(duracao_lote=1.0, timeouts=0, concluidos=10)
+    assert gov.timeout == 2.5
+
+
+def test_prazo_host_cold_start_usa_formula_fixa():
+    gov = _governor()
+    assert gov.prazo_host() == 2.0 * 2 + 5
+
+
+def test_prazo_host_limitado_entre_timeout_min_e_teto():
+    gov = _governor()
+    _registrar(gov, 0.1)
+    assert gov.prazo_host() == gov.timeout_min
+
+    gov = _governor()
+    _registrar(gov, 100.0)
+    assert gov.prazo_host() == 2.0 * 2 + 5
+
+
+def test_prazo_host_nunca_abaixo_do_portscan_esperado():
+    gov = _governor()
+    _registrar(gov, 0.1)
+    # 20 portas em rodadas de 4 conexões de até 2 s: 5 rodadas = 10 s
+    assert gov.prazo_host(20) == 10.0
+    # piso vale também acima do teto (2 x P99 capado em 9 s)
+    gov = _governor()
+    _registrar(gov, 100.0)
+    assert gov.prazo_host(20) == 10.0
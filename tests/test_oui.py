@@ -0,0 +1,96 @@
+"""Tabela OUI (`utils.carregar_tabela_oui`) e lookup por maior prefixo (`scan._fabricante_por_mac`)."""
+
+import marshal
+import os
+
+import pytest
+
+import scan
+import utils
+
+MANUF = (
+    "# comentário\n"
+    "\n"
+    "00:1B:C5\tIeeeRegi\tIEEE Registration Authority\n"
+    "00:1B:C5:00:10/36\tVend36\tVendor Trinta e Seis\n"
+    "00:55:DA\tOui24\n"
+    "00:55:DA:10/28\tVend28\tVendor Vinte e Oito\n"
+    "FC-52-CE\tControl\n"
+)
+
+
+@pytest.fixture
+def manuf(tmp_path):
+    caminho = tmp_path / "manuf"
+    caminho.write_text(MANUF, encoding="utf-8")
+    utils.carregar_tabela_oui.cache_clear()
+    yield str(caminho)
+    utils.carregar_tabela_oui.cache_clear()
+
+
+def _carregar(caminho: str) -> dict:
+    utils.carregar_tabela_oui.cache_clear()
+    return utils.carregar_tabela_oui(caminho)
+
+
+def test_chaves_com_nibble_sentinela(manuf):
+    tabela = _carregar(manuf)
+    assert tabela[0x1001BC5] == "IeeeRegi IEEE Registration Authority"
+    assert tabela[0x10055DA1] == "Vend28 Vendor Vinte e Oito"
+    assert tabela[0x1001BC5001] == "Vend36 Vendor Trinta e Seis"
+    assert tabela[0x1FC52CE] == "Control"
+    assert len(tabela) == 5
+
+
+@pytest.mark.parametrize("mac, esperado", [
+    ("00:1b:c5:00:10:01", "Vend36 Vendor Trinta e Seis"),   # /36 vence o /24
+    ("00:1b:c5:00:20:01", "IeeeRegi IEEE Registration Authority"),
+    ("00:55:da:1f:00:01", "Vend28 Vendor Vinte e Oito"),    # /28 vence o /24
+    ("00:55:da:2f:00:01", "Oui24"),
+    ("fc:52:ce:00:00:01", "Control"),
+    ("aa:bb:cc:00:00:01", "N/D"),
+    ("N/D", "N/D"),
+])
+def test_lookup_pelo_maior_prefixo(manuf, mac, esperado):
+    assert scan._fabricante_por_mac(mac, _carregar(manuf)) == esperado
+
+
+def _gravar_cache(caminho: str, carimbo: tuple, tabela: dict) -> None:
+    with open(caminho + ".marshal", "wb") as f:
+        f.write(utils._OUI_CACHE_CABECALHO)
+        f.write(marshal.dumps((carimbo, tabela)))
+
+
+def test_cache_marshal_gravado_e_reusado(manuf):
+    real = _carregar(manuf)
+    assert os.path.exists(manuf + ".marshal")
+
+    # cache com o carimbo atual é usado sem reparse do manuf
+    st = os.stat(manuf)
+    _gravar_cache(manuf, (st.st_mtime_ns, st.st_size), {1: "do cache"})
+    assert _carregar(manuf) == {1: "do cache"}
+
+    # cabeçalho de outra versão: ignorado
+    with open(manuf + ".marshal", "r+b") as f:
+        f.write(b"X")
+    assert _carregar(manuf) == real
+
+
+def test_cache_invalidado_por_mtime(manuf):
+    _carregar(manuf)
+    st = os.stat(manuf)
+    _gravar_cache(manuf, (st.st_mtime_ns, st.st_size), {1: "velho"})
+    os.utime(manuf, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # mesmo tamanho
+    assert _carregar(manuf)[0x1FC52CE] == "Control"
+
+
+def test_cache_invalidado_por_tamanho(manuf):
+    _carregar(manuf)
+    st = os.stat(manuf)
+    _gravar_cache(manuf, (st.st_mtime_ns, st.st_size), {1: "velho"})
+    with open(manuf, "a", encoding="utf-8") as f:
+        f.write("AA:BB:CC\tNovo\n")
+    os.utime(manuf, ns=(st.st_atime_ns, st.st_mtime_ns))  # mesmo mtime
+    tabela = _carregar(manuf)
+    assert tabela[0x1AABBCC] == "Novo"
+    assert scan._fabricante_por_mac("aa:bb:cc:00:00:01", tabela) == "Novo"
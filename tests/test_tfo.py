@@ -0,0 +1,85 @@
+"""TCP Fast Open no connect do portscan (`scan._abrir_com_tfo`)."""
+
+import asyncio
+import errno
+import socket
+
+import pytest
+
+import scan
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "MSG_FASTOPEN"), reason="SO sem TCP Fast Open"
+)
+
+RESPOSTA = b"HTTP/1.0 200 OK\r\nServer: teste/1.0\r\n\r\n"
+
+
+async def _servidor_tfo():
+    """Servidor HTTP mínimo em 127.0.0.1, com TCP_FASTOPEN no socket de escuta."""
+    async def atender(reader, writer):
+        await reader.read(1024)
+        writer.write(RESPOSTA)
+        await writer.drain()
+        writer.close()
+
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "TCP_FASTOPEN"):
+        srv.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN, 16)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+    servidor = await asyncio.start_server(atender, sock=srv)
+    return servidor, srv.getsockname()[1]
+
+
+async def _banner_via_tfo(porta: int) -> bytes:
+    probe = scan.SERVICE_PROBES[80]
+    reader, writer, enviado = await scan._abrir_com_tfo("127.0.0.1", porta, probe)
+    try:
+        if enviado < len(probe):
+            writer.write(probe[enviado:])
+            await writer.drain()
+        return await asyncio.wait_for(reader.read(1024), 2)
+    finally:
+        writer.close()
+
+
+def test_tfo_abre_conexao_e_le_banner():
+    async def cenario():
+        servidor, porta = await _servidor_tfo()
+        async with servidor:
+            # 2x: a 1ª pega o cookie; a 2ª (se o kernel permitir) manda a probe no SYN
+            return [await _banner_via_tfo(porta) for _ in range(2)]
+
+    assert asyncio.run(cenario()) == [RESPOSTA, RESPOSTA]
+
+
+def test_tfo_eisconn_no_connect_conta_como_aberta(monkeypatch):
+    """Handshake concluído dentro do sendto: sock_connect dá EISCONN e a porta segue aberta."""
+    async def cenario():
+        loop = asyncio.get_running_loop()
+        original = loop.sock_connect
+
+        async def connect_ja_conectado(sock, endereco):
+            await original(sock, endereco)
+            raise OSError(errno.EISCONN, "Transport endpoint is already connected")
+
+        monkeypatch.setattr(loop, "sock_connect", connect_ja_conectado)
+        servidor, porta = await _servidor_tfo()
+        async with servidor:
+            return await _banner_via_tfo(porta)
+
+    assert asyncio.run(cenario()) == RESPOSTA
+
+
+def test_tfo_porta_fechada_recusa():
+    async def cenario():
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+        s.close()  # porta livre, ninguém escutando
+        await scan._abrir_com_tfo("127.0.0.1", porta, scan.SERVICE_PROBES[80])
+
+    with pytest.raises(ConnectionRefusedError):
+        asyncio.run(cenario())
@@ -14,15 +14,30 @@ Luiz
 
 ## Dependências
 - os
+- re
+- ipaddress
+- mmap
+- marshal
+- sys
+- functools
 - rich.console
 """
 
 import os
+import re
+import ipaddress
+import mmap
+import marshal
+import sys
+from functools import lru_cache
 from rich.console import Console
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 console = Console()
 
+_SEM_SEPARADOR = str.maketrans("", "", ":-")  # tira ':'/'-' do prefixo numa passada
+_RE_LINHA_OUI = re.compile(r"^([0-9A-Fa-f][0-9A-Fa-f:\-]*)(?:/(\d+))?[ \t]+([^\r\n]+)", re.MULTILINE)
+
 def _detectar_encoding(caminho: str) -> str:
     """Detecta BOM rápido: UTF-16 LE/BE, UTF-8; fallback utf-8."""
     try:
@@ -39,52 +54,114 @@ def _detectar_encoding(caminho: str) -> str:
     return "utf-8"  # fallback seguro
 
 
+@lru_cache(maxsize=4)
 def carregar_tabela_oui(path='manuf'):
     """
-    Carrega tabela OUI (Wireshark/Nmap) e indexa por:
-    - FC52CE / FC:52:CE (3 bytes)
-    - e também 4/5 bytes quando existirem no arquivo.
+    Carrega tabela OUI (Wireshark/Nmap) como prefixo (int) -> fabricante.
+
+    Uma chave por linha, no tamanho real do prefixo; a chave é o prefixo hex
+    com um nibble "1" na frente, para /24, /28 e /36 não colidirem como int:
+    - FC:52:CE           -> 0x1FC52CE     (/24, 6 hex)
+    - 00:55:DA:10/28     -> 0x10055DA1    (/28, 7 hex)
+    - 00:1B:C5:00:10/36  -> 0x1001BC5001  (/36, 9 hex)
+    Chave int: hash e comparação mais baratos que str, e o lookup deriva as
+    três chaves do MAC por shift, sem fatiar strings.
+
+    Sem variantes com ':' nem sub-prefixos de 4/5 bytes: ~1 entrada por linha
+    em vez de ~6, e os blocos /28 e /36 não sobrescrevem o OUI de 3 bytes.
+    O lookup (maior prefixo primeiro) fica em `scan._fabricante_por_mac`.
+
+    Cache: a tabela pronta vai para `<path>.marshal`, válida enquanto o
+    arquivo tiver o mesmo (mtime_ns, tamanho); na partida seguinte é um
+    `marshal.loads`, sem decode nem regex.
+
+    Memoizado por `path`: chamadas repetidas no mesmo processo devolvem o
+    MESMO dict — somente leitura para quem chama.
     """
     if not os.path.isabs(path):
         path = os.path.join(BASE_DIR, path)
 
-    fabricantes = {}
     if not os.path.exists(path):
         console.print(f"[red]Arquivo '{path}' não encontrado.[/red]")
-        return fabricantes
+        return {}
+
+    st = os.stat(path)
+    carimbo = (st.st_mtime_ns, st.st_size)
+    cache = path + ".marshal"
+    fabricantes = _ler_cache_oui(cache, carimbo)
+    if fabricantes is None:
+        fabricantes = _ler_manuf(path)
+        if fabricantes:
+            _gravar_cache_oui(cache, carimbo, fabricantes)
+    return fabricantes
+
+
+# O formato do marshal muda entre versões do Python: cache de outra versão é ignorado
+_OUI_CACHE_CABECALHO = f"vh-oui-v1 py{sys.version_info[0]}.{sys.version_info[1]} m{marshal.version}\n".encode()
+
+
+def _ler_cache_oui(cache: str, carimbo: tuple):
+    """Tabela do cache se ele for desta versão e do mesmo arquivo; senão None."""
+    try:
+        with open(cache, "rb") as f:
+            dados = f.read()
+        ini = len(_OUI_CACHE_CABECALHO)
+        if dados[:ini] != _OUI_CACHE_CABECALHO:
+            return None
+        salvo, fabricantes = marshal.loads(dados[ini:])
+        return fabricantes if tuple(salvo) == carimbo else None
+    except Exception:
+        return None  # ausente/corrompido: parse normal
+
 
+def _gravar_cache_oui(cache: str, carimbo: tuple, fabricantes: dict) -> None:
+    """Grava o cache (tmp + os.replace: nunca fica pela metade); falha é silenciosa."""
+    try:
+        temporario = cache + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(_OUI_CACHE_CABECALHO)
+            f.write(marshal.dumps((carimbo, fabricantes)))
+        os.replace(temporario, cache)
+    except Exception:
+        pass
+
+
+def _iter_oui(texto: str):
+    """
+    Pares (prefixo int, fabricante) do texto manuf: uma passada de regex no
+    texto inteiro; '#' e linhas vazias não casam a âncora.
+    Formato Wireshark: "OUI[/bits]<TAB>Short<TAB>Long ..." (ou espaços sem tab)
+    """
+    for m in _RE_LINHA_OUI.finditer(texto):
+        raw, bits, resto = m.groups()
+        oui_plain = raw.translate(_SEM_SEPARADOR)
+        if len(oui_plain) < 6:
+            continue
+        nhex = int(bits) // 4 if bits else 6
+        try:
+            chave = int("1" + oui_plain[:nhex], 16)                 # FC52CE / 001BC5001
+        except ValueError:
+            continue
+        yield chave, sys.intern(resto.replace("\t", " ").strip())
+
+
+def _ler_manuf(path: str) -> dict:
+    """Parse do arquivo manuf (sem cache): {prefixo int: fabricante}."""
     enc = _detectar_encoding(path)
 
     try:
-        with open(path, "r", encoding=enc, errors="strict") as f:
-            for linha in f:
-                s = linha.strip()
-                if not s or s.startswith("#"):
-                    continue
-
-                # Divide por tab; formato Wireshark: "OUI<TAB>Short<TAB>Long ..."
-                partes = s.split("\t")
-                if len(partes) < 2:
-                    # fallback: espaço(s) quando não houver tab
-                    partes = s.split()
-                    if len(partes) < 2:
-                        continue
-
-                raw = partes[0].upper().replace("-", ":")
-                grupos = [g.strip() for g in raw.split(":") if g.strip()]
-                if len(grupos) < 3:
-                    continue
-
-                nome = " ".join(partes[1:]).strip()
-                # chaves de 3, 4 e 5 bytes
-                for nbytes in (3, 4, 5):
-                    if len(grupos) >= nbytes:
-                        oui_colon = ":".join(grupos[:nbytes])               # FC:52:CE
-                        oui_plain = oui_colon.replace(":", "")               # FC52CE
-                        fabricantes[oui_colon] = nome
-                        fabricantes[oui_plain] = nome
+        texto = ""
+        if os.path.getsize(path):
+            # mmap: o SO pagina o arquivo direto, sem cópia pelo buffer do stdio;
+            # o decode lê do mapeamento (buffer protocol), sem `bytes` intermediário
+            with open(path, "rb") as fb, mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                texto = str(mm, enc).lstrip("\ufeff")
     except Exception as e:
         console.print(f"[red]Falha ao ler '{path}' ({enc}): {e}[/red]")
+        texto = ""
+
+    # dict() consome os pares direto, em C (sem um STORE_SUBSCR por linha)
+    fabricantes = dict(_iter_oui(texto))
 
     if not fabricantes:
         console.print(f"[yellow]Aviso: tabela OUI vazia após ler {path} ({enc}).[/yellow]")
@@ -105,15 +182,22 @@ def solicitar_dados_input():
     Exemplo de retorno:
         ("10.101.6", 1, 150)
     """
-    console.print("==============================================", style="cyan")
-    console.print(" Verificador de Hosts com Auditoria de Segurança", style="bold white")
-    console.print("==============================================\n", style="cyan")
+    # cabeçalho num print só (um render/flush em vez de três)
+    console.print(
+        "[cyan]==============================================[/cyan]\n"
+        "[bold white] Verificador de Hosts com Auditoria de Segurança[/bold white]\n"
+        "[cyan]==============================================[/cyan]\n"
+    )
 
     # Solicita a base da rede
     while True:
         ip_base = input("Digite a base da rede (ex: 10.101.6): ").strip()
-        if ip_base.count('.') == 2 and all(p.isdigit() for p in ip_base.split('.')):
+        try:
+            # 3 octetos válidos (0-255); rejeita 999.999.999, vazio e base com 4 octetos
+            ipaddress.ip_network(f"{ip_base}.0/24")
             break
+        except ValueError:
+            pass
         console.print("[red]Base inválida. Use o formato: 10.101.X[/red]")
 
     # Solicita IP inicial e final
@@ -121,7 +205,7 @@ def solicitar_dados_input():
         try:
             inicio = int(input("IP inicial (ex: 1): "))
             fim = int(input("IP final (ex: 254): "))
-            if 0 < inicio <= 254 and 0 < fim <= 254 and inicio <= fim:
+            if 1 <= inicio <= fim <= 254:
                 break
             else:
                 console.print("[red]Valores fora do intervalo válido (1 a 254).[/red]")